@@ -1,125 +1,25 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import PyPDF2
-import boto3
+import json
 import os
-from dotenv import load_dotenv
+import queue
 import tempfile
-from botocore.exceptions import BotoCoreError, ClientError
 from tracker import PollyUsageTracker
-from text_preprocessor_pt_br import preprocess_text_pt_br, split_text
-from text_preprocessor_en_us import preprocess_text_en_us_extended, split_text
-import pygame
-
-# Carrega o conteúdo do arquivo .env
-load_dotenv()
-
-# Acessa as variáveis de ambiente
-AWS_KEY = os.getenv("ACCESS_KEY_ID")
-AWS_SECRET = os.getenv("SECRET_ACCESS_KEY")
-AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
-
-LANGUAGES = {
-    "Portuguese": "pt-BR",
-    "English": "en-US"
-}
+from converter import AUDIO_CACHE, LANGUAGES, VOICE_CATALOG, text_to_speech
+from conversion_worker import ConversionWorker, PlanWorker
+from audio_assembly import OUTPUT_FORMATS
+from playback import StreamingPlayer
+from instrumentation import format_report
+from planner import format_plan
+from config import CONVERSION_SERVICE_URL
+from service_client import RemoteConversionWorker, ServiceClient
 
 TEST_TEXTS = {
     "Portuguese": "Este é um teste da voz selecionada em português.",
     "English": "This is a test of the selected voice in English."
 }
 
-def get_voice_capabilities():
-    polly_client = boto3.Session(
-        aws_access_key_id=AWS_KEY,
-        aws_secret_access_key=AWS_SECRET,
-        region_name=AWS_REGION
-    ).client('polly')
-
-    voices = {}
-    for lang_name, lang_code in LANGUAGES.items():
-        try:
-            response = polly_client.describe_voices(LanguageCode=lang_code)
-            for voice in response['Voices']:
-                voices[voice['Id']] = {
-                    'language': lang_name,
-                    'gender': voice['Gender'],
-                    'engine': voice['SupportedEngines']
-                }
-        except (BotoCoreError, ClientError) as error:
-            print(f"Erro ao obter vozes para {lang_name}: {error}")
-    
-    return voices
-
-def extract_text_from_pdf(pdf_path, start_page=None, end_page=None):
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        total_pages = len(reader.pages)
-        
-        # Adjust page range if not specified or out of bounds
-        start_page = max(1, min(start_page or 1, total_pages))
-        end_page = min(end_page or total_pages, total_pages)
-        
-        text = ''
-        for page_num in range(start_page - 1, end_page):
-            text += reader.pages[page_num].extract_text()
-    return text
-
-def text_to_speech(text, output_file, voice_id, language_code):
-    polly_client = boto3.Session(
-        aws_access_key_id=AWS_KEY,
-        aws_secret_access_key=AWS_SECRET,
-        region_name=AWS_REGION
-    ).client('polly')
-
-    try:
-        # Dividir o texto em partes menores
-        text_parts = split_text(text)
-        
-        # Sintetizar cada parte do texto
-        audio_parts = []
-        for part in text_parts:
-            try:
-                # Tenta primeiro com o motor neural
-                response = polly_client.synthesize_speech(
-                    Text=part,
-                    TextType="text",
-                    OutputFormat="mp3",
-                    VoiceId=voice_id,
-                    LanguageCode=language_code,
-                    Engine="neural",
-                    SampleRate="24000",
-                    # Adicione configurações para melhorar a qualidade da fala
-                    SpeechMarkTypes=["word"],
-                    # Ajuste a velocidade da fala (1.0 é a velocidade normal)
-                    VoiceSettings={"EngineSettings": {"SpeechRatePercentage": "100"}}
-                )
-                audio_parts.append(response['AudioStream'].read())
-            except ClientError as e:
-                if 'UnsupportedEngine' in str(e):
-                    # Se falhar com neural, tenta com standard
-                    response = polly_client.synthesize_speech(
-                        Text=part,
-                        TextType="text",
-                        OutputFormat="mp3",
-                        VoiceId=voice_id,
-                        LanguageCode=language_code,
-                        Engine="standard",
-                        SampleRate="24000"
-                    )
-                    audio_parts.append(response['AudioStream'].read())
-                else:
-                    raise
-
-        # Combinar todas as partes de áudio
-        with open(output_file, 'wb') as file:
-            for part in audio_parts:
-                file.write(part)
-
-    except (BotoCoreError, ClientError) as error:
-        raise Exception(f"Falha ao sintetizar fala: {error}")
-
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -128,16 +28,13 @@ class App(ctk.CTk):
         self.geometry("980x620")
 
         self.usage_tracker = PollyUsageTracker()
-        self.usage_tracker.load_from_file()  # Load previous usage data if available
+        self.usage_tracker.load_from_file()  # Import the former JSON log on first run
 
-        # Initialize voice_capabilities
-        self.voice_capabilities = {}
+        # Timing report of the last finished conversion, shown in the admin panel
+        self.last_report = None
 
-        # Fetch voice capabilities from Amazon Polly
-        try:
-            self.voice_capabilities = get_voice_capabilities()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load voice capabilities: {str(e)}")
+        # Start from the voice catalog saved by a previous run; Polly is only asked when it is stale
+        self.voice_capabilities = VOICE_CATALOG.load()
 
         # Create the main screen
         self.create_main_screen()
@@ -145,11 +42,21 @@ class App(ctk.CTk):
         # Create admin screen
         self.create_admin_screen()
 
-        # Update voice options with the fetched data
+        # Update voice options with the cached data
         self.update_voice_options()
 
-        # Inicialize o pygame mixer
-        pygame.mixer.init()
+        if VOICE_CATALOG.is_stale():
+            self.poll_voice_catalog(VOICE_CATALOG.refresh_in_background())
+
+        # O mixer do pygame só é carregado no primeiro Play
+        self._mixer = None
+
+    def mixer(self):
+        if self._mixer is None:
+            import pygame
+            pygame.mixer.init()
+            self._mixer = pygame.mixer
+        return self._mixer
 
     def create_admin_screen(self):
         self.admin_frame = ctk.CTkFrame(self)
@@ -165,9 +72,12 @@ class App(ctk.CTk):
         self.refresh_button = ctk.CTkButton(self.admin_frame, text="Refresh Log", command=self.refresh_log)
         self.refresh_button.grid(row=2, column=0, padx=10, pady=10)
 
-        self.save_log_button = ctk.CTkButton(self.admin_frame, text="Save Log", command=self.save_log)
+        self.save_log_button = ctk.CTkButton(self.admin_frame, text="Export Log", command=self.save_log)
         self.save_log_button.grid(row=3, column=0, padx=10, pady=10)
 
+        self.save_report_button = ctk.CTkButton(self.admin_frame, text="Save Report", command=self.save_report)
+        self.save_report_button.grid(row=4, column=0, padx=10, pady=10)
+
         self.refresh_log()  # Initial log display
 
     def refresh_log(self):
@@ -177,18 +87,44 @@ class App(ctk.CTk):
 
         summary_text = f"Total Characters: {summary['total_characters']}\n"
         summary_text += f"Total Requests: {summary['total_requests']}\n"
-        summary_text += f"Avg. Characters/Request: {summary['average_characters_per_request']:.2f}\n\n"
+        summary_text += f"Avg. Characters/Request: {summary['average_characters_per_request']:.2f}\n"
+        summary_text += f"Cache Hits: {summary['cache_hits']}\n"
+        for engine, totals in summary['engines'].items():
+            summary_text += f"  {engine}: {totals['characters']} chars, {totals['requests']} requests\n"
+        if AUDIO_CACHE is not None:
+            cache = AUDIO_CACHE.stats()
+            summary_text += f"Audio Cache: {cache['entries']} segments, {cache['bytes'] / (1024 * 1024):.1f} MB, "
+            summary_text += f"{cache['hit_rate']:.0%} hit rate over {cache['hits'] + cache['misses']} lookups\n"
+        summary_text += "\n"
+
+        if self.last_report is not None:
+            summary_text += f"Last Conversion:\n{format_report(self.last_report)}\n\n"
         
         self.log_text.insert(tk.END, summary_text)
 
         for entry in log_entries:
             entry_text = f"{entry['timestamp']} - {entry['characters']} chars, "
-            entry_text += f"Voice: {entry['voice_id']}, Engine: {entry['engine']}\n"
+            entry_text += f"Voice: {entry['voice_id']}, Engine: {entry['engine'] or 'unknown'}"
+            if entry['cache_hit']:
+                entry_text += " (cached)"
+            elif entry['latency'] is not None:
+                entry_text += f", {entry['latency']:.2f}s"
+            entry_text += "\n"
             self.log_text.insert(tk.END, entry_text)
 
     def save_log(self):
         self.usage_tracker.save_to_file()
-        messagebox.showinfo("Log Saved", "The usage log has been saved successfully.")
+        messagebox.showinfo("Log Exported", "The usage log has been exported to polly_usage_log.json.")
+
+    def save_report(self):
+        if self.last_report is None:
+            messagebox.showerror("Error", "No conversion has finished yet.")
+            return
+
+        filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        if filename:
+            with open(filename, "w") as f:
+                json.dump(self.last_report, f, indent=2)
 
     def create_main_screen(self):
         # Initialize variables
@@ -262,7 +198,11 @@ class App(ctk.CTk):
 
         # Convert Button
         self.convert_button = ctk.CTkButton(self.main_frame, text="Convert", command=self.convert)
-        self.convert_button.grid(row=10, column=0, columnspan=2, padx=10, pady=20)
+        self.convert_button.grid(row=10, column=0, padx=10, pady=20)
+
+        # Cancel Button (enabled while a conversion is running)
+        self.cancel_button = ctk.CTkButton(self.main_frame, text="Cancel", command=self.cancel_conversion, state="disabled")
+        self.cancel_button.grid(row=10, column=1, padx=10, pady=20)
 
         # Play Button
         self.play_button = ctk.CTkButton(self.main_frame, text="Play", command=self.play_audio)
@@ -272,6 +212,32 @@ class App(ctk.CTk):
         self.stop_button = ctk.CTkButton(self.main_frame, text="Stop", command=self.stop_audio)
         self.stop_button.grid(row=12, column=0, columnspan=2, padx=10, pady=20)
 
+        # Conversion progress
+        self.progress_bar = ctk.CTkProgressBar(self.main_frame)
+        self.progress_bar.grid(row=13, column=0, columnspan=2, padx=10, pady=(10, 0), sticky="ew")
+        self.progress_bar.set(0)
+
+        self.progress_label = ctk.CTkLabel(self.main_frame, text="")
+        self.progress_label.grid(row=14, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
+        # Progressive playback: start listening as soon as the first chunk is synthesized
+        self.stream_playback = tk.BooleanVar(value=False)
+        self.stream_checkbox = ctk.CTkCheckBox(self.main_frame, text="Play while converting", variable=self.stream_playback)
+        self.stream_checkbox.grid(row=15, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        # Dry run first: pages, chunks, cost and time, to confirm or narrow the page range
+        self.confirm_plan = tk.BooleanVar(value=True)
+        self.plan_checkbox = ctk.CTkCheckBox(self.main_frame, text="Show plan before converting", variable=self.confirm_plan)
+        self.plan_checkbox.grid(row=15, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        self.buffer_label = ctk.CTkLabel(self.main_frame, text="")
+        self.buffer_label.grid(row=16, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
+        self.worker = None
+        self.planner = None
+        self.service = ServiceClient(CONVERSION_SERVICE_URL) if CONVERSION_SERVICE_URL else None
+        self.player = None
+
         # Initialize voice options
         self.update_voice_options()
 
@@ -286,12 +252,16 @@ class App(ctk.CTk):
             return
 
         try:
-            pygame.mixer.music.load(output_file)
-            pygame.mixer.music.play()
+            self.mixer().music.load(output_file)
+            self.mixer().music.play()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to play audio: {str(e)}")
 
     def stop_audio(self):
+        if self.player is not None:
+            self.player.stop()
+            return
+
         output_file = self.output_path.get()
         if not output_file:
             messagebox.showerror("Error", "Please select an output file first.")
@@ -302,8 +272,8 @@ class App(ctk.CTk):
             return
 
         try:
-            pygame.mixer.music.load(output_file)
-            pygame.mixer.music.stop()
+            self.mixer().music.load(output_file)
+            self.mixer().music.stop()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to stop audio: {str(e)}")
 
@@ -320,12 +290,27 @@ class App(ctk.CTk):
             self.voice_menu.configure(values=["No voices available"])
             self.voice_id.set("")
 
+    def poll_voice_catalog(self, refresh):
+        if refresh.is_alive():
+            self.after(200, self.poll_voice_catalog, refresh)
+            return
+
+        if VOICE_CATALOG.error and not VOICE_CATALOG.voices:
+            messagebox.showerror("Error", f"Failed to load voice capabilities: {VOICE_CATALOG.error}")
+        elif VOICE_CATALOG.voices != self.voice_capabilities:
+            selected_voice = self.voice_id.get()
+            self.voice_capabilities = VOICE_CATALOG.voices
+            self.update_voice_options()
+            if selected_voice in self.voice_capabilities and \
+                    self.voice_capabilities[selected_voice]['language'] == self.language.get():
+                self.voice_id.set(selected_voice)
+
     def browse_pdf(self):
         filename = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
         self.pdf_path.set(filename)
 
     def browse_output(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".mp3", filetypes=[("MP3 files", "*.mp3")])
+        filename = filedialog.asksaveasfilename(defaultextension=".mp3", filetypes=[("MP3 files", "*.mp3"), ("WAV files", "*.wav")])
         self.output_path.set(filename)
 
     def test_voice(self):
@@ -339,7 +324,8 @@ class App(ctk.CTk):
 
         with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
             try:
-                text_to_speech(test_text, temp_file.name, voice_id, selected_language)
+                text_to_speech(test_text, temp_file.name, voice_id, LANGUAGES[selected_language], resume=False,
+                               reuse_previous=False, write_index=False, usage=self.usage_tracker)
                 os.system(f"xdg-open {temp_file.name}")  # This will open the default audio player
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to test voice: {str(e)}")
@@ -353,6 +339,10 @@ class App(ctk.CTk):
         voice_id = self.voice_id.get()
         selected_language = self.language.get()
 
+        if self.worker is not None or self.planner is not None:
+            messagebox.showerror("Error", "A conversion is already running.")
+            return
+
         if not pdf_path or not output_file:
             messagebox.showerror("Error", "Please select both input PDF and output file.")
             return
@@ -362,9 +352,6 @@ class App(ctk.CTk):
             start_page = int(self.start_page_entry.get()) if self.start_page_entry.get() else None
             end_page = int(self.end_page_entry.get()) if self.end_page_entry.get() else None
 
-            # Extract text from PDF
-            text = extract_text_from_pdf(pdf_path, start_page, end_page)
-
             # Verify language and voice selection
             if selected_language not in LANGUAGES:
                 raise ValueError(f"Invalid language selected: {selected_language}")
@@ -373,27 +360,150 @@ class App(ctk.CTk):
             
             if voice_id not in self.voice_capabilities or self.voice_capabilities[voice_id]['language'] != selected_language:
                 raise ValueError(f"Invalid voice selected for {selected_language}: {voice_id}")
+        except ValueError as ve:
+            messagebox.showerror("Error", str(ve))
+            return
 
-            # Pre-process text based on selected language
-            if language_code == 'pt-BR':
-                processed_text = preprocess_text_pt_br(text)
-            elif language_code == 'en-US':
-                processed_text = preprocess_text_en_us_extended(text)
+        job = (pdf_path, output_file, voice_id, language_code, start_page, end_page)
+        if not self.confirm_plan.get():
+            self.start_conversion(*job)
+            return
+
+        # Extracted pages are cached, so the conversion does not extract them again
+        self.planner = PlanWorker(*job, usage=self.usage_tracker)
+        self.planner.start()
+        self.convert_button.configure(state="disabled")
+        self.progress_label.configure(text="Planning: extracting and chunking the text...")
+        self.after(100, lambda: self.poll_planner(job))
+
+    def poll_planner(self, job):
+        try:
+            event = self.planner.events.get_nowait()
+        except queue.Empty:
+            self.after(100, lambda: self.poll_planner(job))
+            return
+
+        self.planner = None
+        self.convert_button.configure(state="normal")
+        self.progress_label.configure(text="")
+        if event["type"] == "error":
+            messagebox.showerror("Error", f"An error occurred: {event['message']}")
+            return
+        message = format_plan(event["plan"]) + "\n\nConvert now? Choose No to change the page range first."
+        if messagebox.askyesno("Conversion plan", message):
+            self.start_conversion(*job)
+
+    def start_conversion(self, pdf_path, output_file, voice_id, language_code, start_page, end_page):
+        # Chunks are not streamed back from the conversion service
+        stream = self.stream_playback.get() and self.service is None
+        if stream:
+            try:
+                self.start_player(output_file)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to start playback: {str(e)}")
+                return
+
+        # Extract, pre-process and convert the PDF page by page in the background
+        if self.service is not None:
+            # Queued in the local service with everyone else's jobs, under its shared request budget
+            self.worker = RemoteConversionWorker(self.service, pdf_path, output_file, voice_id, language_code,
+                                                 start_page, end_page)
+        else:
+            self.worker = ConversionWorker(pdf_path, output_file, voice_id, language_code, start_page, end_page,
+                                           stream=stream, usage=self.usage_tracker)
+        self.worker.start()
+
+        self.convert_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.progress_bar.set(0)
+        self.progress_label.configure(text="Starting conversion...")
+        self.after(100, self.poll_worker)
+
+    def cancel_conversion(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.configure(state="disabled")
+            self.progress_label.configure(text="Cancelling after the current chunk...")
+
+    def poll_worker(self):
+        worker = self.worker
+        while True:
+            try:
+                event = worker.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event["type"] == "progress":
+                self.show_progress(event)
+                continue
+
+            if event["type"] == "audio":
+                if self.player is not None:
+                    self.player.add(event["audio"], event["duration"])
+                continue
+
+            if self.player is not None:
+                # Whatever was synthesized keeps playing; the Stop button ends it
+                self.player.finish()
+
+            self.worker = None
+            self.convert_button.configure(state="normal")
+            self.cancel_button.configure(state="disabled")
+
+            if event["type"] == "done":
+                self.progress_bar.set(1)
+                self.progress_label.configure(text="Done")
+                messagebox.showinfo("Success", "Conversion completed successfully!")
+
+                # Every chunk was already recorded in the usage ledger
+                self.last_report = event["report"]
+                self.refresh_log()
+            elif event["type"] == "cancelled":
+                self.progress_label.configure(text="Cancelled")
             else:
-                raise ValueError(f"Unsupported language code: {language_code}")
+                self.progress_label.configure(text="Failed")
+                messagebox.showerror("Error", f"An error occurred: {event['message']}")
+            return
 
-            # Convert text to speech
-            text_to_speech(processed_text, output_file, voice_id, language_code)
-            
-            messagebox.showinfo("Success", "Conversion completed successfully!")
-            
-            # Update usage tracker
-            self.usage_tracker.add_entry(len(processed_text), voice_id)
-            self.refresh_log()
-        except ValueError as ve:
-            messagebox.showerror("Error", str(ve))
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.after(100, self.poll_worker)
+
+    def start_player(self, output_file):
+        if self.player is not None:
+            self.player.stop()
+        mixer = self.mixer()
+        mixer.music.stop()
+        audio_format, sample_rate = OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), OUTPUT_FORMATS[".mp3"])
+        self.player = StreamingPlayer(mixer, audio_format, sample_rate)
+        self.buffer_label.configure(text="Playback: waiting for the first chunk...")
+        self.after(100, self.poll_player)
+
+    def poll_player(self):
+        player = self.player
+        if player is None:
+            return
+        player.pump()
+
+        state = player.state()
+        if state == "done":
+            self.player = None
+            self.buffer_label.configure(text="")
+            return
+
+        status = f"Playback: {state} - {player.buffered_seconds():.1f} s buffered"
+        if player.underruns:
+            status += f" - {player.underruns} pause(s) waiting for audio"
+        self.buffer_label.configure(text=status)
+        self.after(100, self.poll_player)
+
+    def show_progress(self, event):
+        if event["pages_total"]:
+            self.progress_bar.set(event["pages_extracted"] / event["pages_total"])
+        status = (f"Pages {event['pages_extracted']}/{event['pages_total']} - "
+                  f"{event['chunks_synthesized']} chunks - {event['bytes_written'] / (1024 * 1024):.1f} MB")
+        if event["eta"] is not None:
+            minutes, seconds = divmod(int(event["eta"]), 60)
+            status += f" - ETA {minutes}:{seconds:02d}"
+        self.progress_label.configure(text=status)
 
 if __name__ == "__main__":
     app = App()
@@ -0,0 +1,234 @@
+import io
+import json
+import mmap
+import struct
+import tempfile
+from contextlib import contextmanager
+
+# Polly OutputFormat and SampleRate for each output file extension; PCM is wrapped in one WAV container
+OUTPUT_FORMATS = {
+    ".mp3": ("mp3", "24000"),
+    ".wav": ("pcm", "16000"),
+}
+
+# MPEG audio layer III tables, indexed by the header fields
+MPEG1_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+MPEG2_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+WAV_HEADER_SIZE = 44
+PCM_SAMPLE_WIDTH = 2  # Polly PCM is signed 16-bit little-endian mono
+
+# Audio is read from Polly and copied to the output in blocks of this size
+AUDIO_BLOCK_SIZE = 64 * 1024
+# Segments larger than this wait for their turn on disk instead of in memory
+SEGMENT_SPILL_SIZE = 256 * 1024
+
+
+class SegmentBuffer:
+    """
+    Audio of one synthesized chunk, held in memory up to `spill_size` bytes and in an anonymous
+    temporary file beyond that, so segments finished ahead of their turn do not pile up in RAM.
+    """
+    def __init__(self, spill_size=SEGMENT_SPILL_SIZE):
+        self.spill_size = spill_size
+        self.file = io.BytesIO()
+        self.size = 0
+
+    @classmethod
+    def from_stream(cls, stream, block_size=AUDIO_BLOCK_SIZE, spill_size=SEGMENT_SPILL_SIZE):
+        buffer = cls(spill_size)
+        for block in iter(lambda: stream.read(block_size), b''):
+            buffer.write(block)
+        return buffer
+
+    def write(self, block):
+        if isinstance(self.file, io.BytesIO) and self.size + len(block) > self.spill_size:
+            spilled = tempfile.TemporaryFile()
+            spilled.write(self.file.getbuffer())
+            self.file = spilled
+        self.file.write(block)
+        self.size += len(block)
+
+    def __len__(self):
+        return self.size
+
+    @contextmanager
+    def view(self):
+        # Zero-copy, read-only access to the whole segment
+        if isinstance(self.file, io.BytesIO):
+            with self.file.getbuffer() as view:
+                yield view
+        else:
+            self.file.flush()
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def close(self):
+        self.file.close()
+
+
+@contextmanager
+def audio_view(audio):
+    if isinstance(audio, SegmentBuffer):
+        with audio.view() as view:
+            yield view
+    else:
+        yield memoryview(audio)
+
+
+def _skip_id3v2(data):
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _frame_info(data, pos):
+    """
+    Returns (frame length, duration in seconds) of the layer III frame at pos, or None.
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x03
+    layer = (data[pos + 1] >> 1) & 0x03
+    bitrate_index = data[pos + 2] >> 4
+    sample_rate_index = (data[pos + 2] >> 2) & 0x03
+    padding = (data[pos + 2] >> 1) & 0x01
+    if version == 1 or layer != 1 or sample_rate_index == 3:
+        return None
+    bitrate = (MPEG1_BITRATES if version == 3 else MPEG2_BITRATES)[bitrate_index] * 1000
+    if not bitrate:
+        return None
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if version == 3 else 576
+    length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples / sample_rate
+
+
+def mp3_frame_spans(data):
+    """
+    Returns (spans, duration) for one MP3 segment, where spans are the (start, end) byte ranges
+    holding its audio frames: ID3 tags and the Xing/Info/VBRI header frame are left out so
+    segments can be joined into a single valid stream.
+    """
+    pos = _skip_id3v2(data)
+    end = len(data)
+    if end - pos >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128
+
+    spans = []
+    duration = 0.0
+    first = True
+    while pos < end:
+        info = _frame_info(data, pos)
+        if info is None or pos + info[0] > end:
+            # Not a frame boundary: resynchronize on the next frame header
+            pos += 1
+            continue
+        length, frame_duration = info
+        header = bytes(data[pos + 4:pos + 40])
+        if first and any(tag in header for tag in (b'Xing', b'Info', b'VBRI')):
+            pass  # encoder summary frame, describes this segment only
+        elif spans and spans[-1][1] == pos:
+            spans[-1] = (spans[-1][0], pos + length)
+            duration += frame_duration
+        else:
+            spans.append((pos, pos + length))
+            duration += frame_duration
+        first = False
+        pos += length
+    return spans, duration
+
+
+def wav_header(data_size, sample_rate):
+    byte_rate = sample_rate * PCM_SAMPLE_WIDTH
+    return (b'RIFF' + struct.pack('<I', 36 + data_size) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, sample_rate, byte_rate, PCM_SAMPLE_WIDTH, 16)
+            + b'data' + struct.pack('<I', data_size))
+
+
+class AudioAssembler:
+    """
+    Appends synthesized segments to an open output file as one stream, without re-encoding,
+    and keeps a segment index (byte offset, length, start time and duration of each chunk).
+
+    `offset` and `segments` (dicts with offset, length, duration and optionally the chunk hash)
+    let a resumed job continue an existing partial file.
+    """
+    def __init__(self, file, audio_format, sample_rate, offset=0, segments=()):
+        self.file = file
+        self.audio_format = audio_format
+        self.sample_rate = int(sample_rate)
+        self.segments = []
+        self.duration = 0.0
+        for segment in segments:
+            self.segments.append({
+                "chunk": len(self.segments),
+                "offset": segment["offset"],
+                "length": segment["length"],
+                "start": self.duration,
+                "duration": segment.get("duration", 0.0),
+                "hash": segment.get("hash"),
+            })
+            self.duration += segment.get("duration", 0.0)
+        self.offset = offset
+        if audio_format == "pcm" and offset == 0:
+            self.file.write(wav_header(0, self.sample_rate))
+            self.offset = WAV_HEADER_SIZE
+
+    def add(self, audio, chunk_hash=None):
+        """
+        Appends one segment, given as bytes or a SegmentBuffer, copying it in blocks.
+        `chunk_hash` identifies the chunk in the index, so a later conversion can reuse the segment.
+        """
+        with audio_view(audio) as view:
+            if self.audio_format == "mp3":
+                spans, duration = mp3_frame_spans(view)
+                if not spans:
+                    # No recognizable frames: keep the data rather than drop audio silently
+                    spans = [(0, len(view))]
+            else:
+                spans, duration = [(0, len(view))], len(view) / (self.sample_rate * PCM_SAMPLE_WIDTH)
+            length = 0
+            for start, end in spans:
+                for block_start in range(start, end, AUDIO_BLOCK_SIZE):
+                    block = view[block_start:min(end, block_start + AUDIO_BLOCK_SIZE)]
+                    self.file.write(block)
+                    length += len(block)
+                    if isinstance(block, memoryview):
+                        block.release()
+        segment = {
+            "chunk": len(self.segments),
+            "offset": self.offset,
+            "length": length,
+            "start": self.duration,
+            "duration": duration,
+            "hash": chunk_hash,
+        }
+        self.segments.append(segment)
+        self.offset += length
+        self.duration += duration
+        return segment
+
+    def finish(self):
+        if self.audio_format == "pcm":
+            # The sizes are only known at the end
+            self.file.seek(0)
+            self.file.write(wav_header(self.offset - WAV_HEADER_SIZE, self.sample_rate))
+            self.file.seek(self.offset)
+
+    def write_index(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                "format": self.audio_format,
+                "sample_rate": self.sample_rate,
+                "duration": self.duration,
+                "bytes": self.offset,
+                "segments": self.segments,
+            }, f, indent=2)
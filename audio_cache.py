@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def chunk_key(text, voice_id, engine, language_code, sample_rate, output_format):
+    """
+    Content address of a synthesized chunk: any change to the text or voice settings gives a new key.
+    """
+    digest = hashlib.sha256()
+    for field in (text, voice_id, engine, language_code, sample_rate, output_format):
+        digest.update(str(field).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """
+    On-disk cache of synthesized audio, one file per chunk key, evicted least-recently-used
+    once the directory grows past `max_bytes`.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._entries = None  # key -> size, oldest first; loaded on first use
+        self._total_bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self):
+        if self._entries is not None:
+            return
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.startswith('.tmp'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found.append((stat.st_mtime, name, stat.st_size))
+        found.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in found)
+        self._total_bytes = sum(self._entries.values())
+
+    def __contains__(self, key):
+        # Whether key is cached, without reading it or counting a lookup
+        with self.lock:
+            self._load_index()
+            return key in self._entries
+
+    def get(self, key):
+        with self.lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                # mtime records recency so LRU order survives restarts
+                os.utime(path)
+            except FileNotFoundError:
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self._load_index()
+            self._total_bytes += len(data) - self._entries.get(key, 0)
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._total_bytes -= size
+
+    def stats(self):
+        # Lookups since the process started; entries and bytes on disk
+        with self.lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
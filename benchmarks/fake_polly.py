@@ -0,0 +1,207 @@
+"""
+Local stand-in for the Polly SynthesizeSpeech API, so conversions can be benchmarked without
+AWS costs or network noise. It answers POST /v1/speech like Polly does, after a configurable
+latency, with silent MP3 frames (or PCM samples) of a size proportional to the text, and
+throttles a configurable fraction of requests.
+
+Asynchronous synthesis tasks are served too (POST /v1/synthesisTasks, GET
+/v1/synthesisTasks/<id>): a task completes after the same latency, and its result is then
+available from the same server acting as S3 (GET and DELETE /<bucket>/<key>). A fraction of
+task status checks can be dropped without a response, like a lost connection.
+
+    python benchmarks/fake_polly.py --latency-ms 150 --throttle-rate 0.05
+    AWS_ENDPOINT_URL_POLLY=http://127.0.0.1:<port> python cli.py ...
+    AWS_ENDPOINT_URL_POLLY=http://127.0.0.1:<port> AWS_ENDPOINT_URL_S3=http://127.0.0.1:<port> \
+        python cli.py --s3-bucket fake ...
+
+The listening port is printed on the first line of output.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One silent MPEG 2 layer III frame: 48 kbit/s, 24 kHz, mono, 144 bytes, 24 ms of audio
+MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+# Polly output is about 6 KB per second of speech at ~15 characters per second
+AUDIO_BYTES_PER_CHARACTER = 400
+
+
+class FakePollyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        settings = self.server.settings
+        if self.path.rstrip("/") == "/v1/synthesisTasks":
+            self.start_task(json.loads(body or b"{}"))
+            return
+        if self.path.rstrip("/") != "/v1/speech":
+            self.send_error_json(404, "UnknownOperationException", self.path)
+            return
+
+        request = json.loads(body or b"{}")
+        text = request.get("Text", "")
+        with self.server.lock:
+            self.server.requests += 1
+            throttled = self.server.random.random() < settings.throttle_rate
+        time.sleep(max(0.0, self.server.random.gauss(settings.latency_ms, settings.jitter_ms)) / 1000)
+        if throttled:
+            with self.server.lock:
+                self.server.throttled += 1
+            self.send_error_json(400, "ThrottlingException", "Rate exceeded")
+            return
+
+        audio = self.audio(text, request.get("OutputFormat"))
+        content_type = "audio/pcm" if request.get("OutputFormat") == "pcm" else "audio/mpeg"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(audio)))
+        self.send_header("x-amzn-RequestCharacters", str(len(text)))
+        self.send_header("x-amzn-RequestId", f"fake-{self.server.requests}")
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def start_task(self, request):
+        task_id = uuid.uuid4().hex
+        bucket = request.get("OutputS3BucketName", "")
+        key = f"{request.get('OutputS3KeyPrefix', '')}{task_id}.{request.get('OutputFormat', 'mp3')}"
+        task = {
+            "TaskId": task_id,
+            "TaskStatus": "scheduled",
+            "OutputUri": f"http://127.0.0.1:{self.server.server_port}/{bucket}/{key}",
+            "RequestCharacters": len(request.get("Text", "")),
+            "Engine": request.get("Engine", "standard"),
+            "VoiceId": request.get("VoiceId"),
+        }
+        latency = max(0.0, self.server.random.gauss(self.server.settings.latency_ms, self.server.settings.jitter_ms))
+        with self.server.lock:
+            self.server.tasks_started += 1
+            self.server.tasks[task_id] = (task, time.monotonic() + latency / 1000, bucket, key,
+                                          self.audio(request.get("Text", ""), request.get("OutputFormat")))
+        self.send_json(200, {"SynthesisTask": task})
+
+    def do_GET(self):
+        if self.path.startswith("/v1/synthesisTasks/"):
+            with self.server.lock:
+                dropped = self.server.random.random() < self.server.settings.poll_failure_rate
+                entry = self.server.tasks.get(self.path.rsplit("/", 1)[1])
+                if entry is not None and not dropped and time.monotonic() >= entry[1]:
+                    task, _, bucket, key, audio = entry
+                    if task["TaskStatus"] != "completed":
+                        task["TaskStatus"] = "completed"
+                        self.server.objects[(bucket, key)] = audio
+            if dropped:
+                # Connection lost before the response
+                self.close_connection = True
+                return
+            if entry is None:
+                self.send_error_json(400, "SynthesisTaskNotFoundException", self.path)
+                return
+            if entry[0]["TaskStatus"] != "completed":
+                entry[0]["TaskStatus"] = "inProgress"
+            self.send_json(200, {"SynthesisTask": entry[0]})
+            return
+
+        audio = self.server.objects.get(self.s3_object())
+        if audio is None:
+            self.send_error_json(404, "NoSuchKey", self.path)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def do_DELETE(self):
+        with self.server.lock:
+            self.server.objects.pop(self.s3_object(), None)
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def s3_object(self):
+        # Path-style S3 request: /<bucket>/<key>
+        bucket, _, key = self.path.split("?", 1)[0].lstrip("/").partition("/")
+        return bucket, key
+
+    def audio(self, text, output_format):
+        size = len(text) * self.server.settings.audio_bytes_per_character
+        if output_format == "pcm":
+            return bytes(size - size % 2)
+        return MP3_FRAME * max(1, size // len(MP3_FRAME))
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, code, message):
+        payload = json.dumps({"message": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("x-amzn-ErrorType", code)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(latency_ms=100.0, jitter_ms=20.0, throttle_rate=0.0,
+                 audio_bytes_per_character=AUDIO_BYTES_PER_CHARACTER, port=0, seed=0, poll_failure_rate=0.0):
+    """
+    Starts the fake endpoint on a daemon thread and returns the server;
+    its URL is f"http://127.0.0.1:{server.server_port}".
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakePollyHandler)
+    server.daemon_threads = True
+    server.settings = argparse.Namespace(latency_ms=latency_ms, jitter_ms=jitter_ms, throttle_rate=throttle_rate,
+                                         audio_bytes_per_character=audio_bytes_per_character,
+                                         poll_failure_rate=poll_failure_rate)
+    server.lock = threading.Lock()
+    server.random = random.Random(seed)
+    server.requests = 0
+    server.throttled = 0
+    server.tasks = {}
+    server.tasks_started = 0
+    server.objects = {}  # fake S3: (bucket, key) -> bytes
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Polly SynthesizeSpeech endpoint.")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests throttled")
+    parser.add_argument("--audio-bytes-per-character", type=int, default=AUDIO_BYTES_PER_CHARACTER)
+    parser.add_argument("--poll-failure-rate", type=float, default=0.0,
+                        help="Fraction of synthesis task status checks dropped without a response")
+    args = parser.parse_args(argv)
+
+    server = start_server(args.latency_ms, args.jitter_ms, args.throttle_rate,
+                          args.audio_bytes_per_character, args.port, poll_failure_rate=args.poll_failure_rate)
+    print(server.server_port, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps({"requests": server.requests, "throttled": server.throttled,
+                          "tasks_started": server.tasks_started}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Generates the benchmark PDFs: deterministic, text-only documents in Portuguese and English
+with running heads, page footers, figures, currency and percentages, like the reports the
+app is used on. Files are written to benchmarks/fixtures/ and reused once generated.
+
+    python benchmarks/fixtures.py --pages 10 100 1000
+"""
+import argparse
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_SIZES = [10, 100, 1000]
+LANGUAGES = ["pt-BR", "en-US"]
+SEED = 1234
+
+LINES_PER_PAGE = 40
+LINE_WIDTH = 90
+
+VOCABULARY = {
+    "pt-BR": {
+        "words": ("fundo receita patrimônio cotista relatório mercado imóveis aluguel contrato gestão "
+                  "resultado período investimento carteira valor distribuição ativos vacância locação "
+                  "rendimento crescimento análise trimestre dividendos papel tijolo").split(),
+        "glue": "de do da com para em pelo sobre entre no na e".split(),
+        "keywords": ["importante", "atenção", "observe", "veículos"],
+        "header": "Relatório Gerencial {year} — Fundo Imobiliário Exemplo",
+        "footer": "Página {page} de {pages} · © {year} Gestora Exemplo. Todos os direitos reservados.",
+        "money": lambda rng: f"R$ {rng.randint(1, 999)}.{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}",
+        "percent": lambda rng: f"{rng.randint(0, 99)},{rng.randint(0, 9)}%",
+    },
+    "en-US": {
+        "words": ("fund revenue equity shareholder report market property lease contract management "
+                  "result period investment portfolio value distribution assets vacancy rental "
+                  "yield growth analysis quarter dividends paper brick").split(),
+        "glue": "of the with for in by about between on and".split(),
+        "keywords": ["important", "attention", "note", "vehicles"],
+        "header": "Management Report {year} — Example Real Estate Fund",
+        "footer": "Page {page} of {pages} · © {year} Example Asset Management. All rights reserved.",
+        "money": lambda rng: f"${rng.randint(1, 999)},{rng.randint(0, 999):03d}.{rng.randint(0, 99):02d}",
+        "percent": lambda rng: f"{rng.randint(0, 99)}.{rng.randint(0, 9)}%",
+    },
+}
+
+
+def sentence(rng, vocabulary):
+    words = []
+    for _ in range(rng.randint(8, 22)):
+        roll = rng.random()
+        if roll < 0.05:
+            words.append(vocabulary["money"](rng))
+        elif roll < 0.09:
+            words.append(vocabulary["percent"](rng))
+        elif roll < 0.13:
+            words.append(str(rng.randint(1, 5000)))
+        elif roll < 0.16:
+            words.append(rng.choice(vocabulary["keywords"]))
+        elif roll < 0.45:
+            words.append(rng.choice(vocabulary["glue"]))
+        else:
+            words.append(rng.choice(vocabulary["words"]))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", ".", ".", "!", "?"])
+
+
+def page_lines(rng, vocabulary, page, pages, year=2024):
+    lines = [vocabulary["header"].format(year=year), ""]
+    line = ""
+    while len(lines) < LINES_PER_PAGE - 2:
+        for word in sentence(rng, vocabulary).split():
+            if line and len(line) + 1 + len(word) > LINE_WIDTH:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+    lines.append("")
+    lines.append(vocabulary["footer"].format(page=page, pages=pages, year=year))
+    return lines
+
+
+def _pdf_string(text):
+    # Literal string in WinAnsiEncoding, which cp1252 matches
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def write_pdf(path, pages):
+    """
+    Writes a minimal PDF with one page per list of text lines.
+    """
+    count = len(pages)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, lines in enumerate(pages):
+        content = b"BT /F1 10 Tf 12 TL 40 760 Td " + b" ".join(_pdf_string(line) + b" Tj T*" for line in lines) + b" ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(out)
+    os.replace(temp_path, path)
+
+
+def fixture_path(pages, language):
+    """
+    Returns the path of the fixture, generating it first if needed.
+    """
+    path = os.path.join(FIXTURES_DIR, f"{language}-{pages}.pdf")
+    if not os.path.exists(path):
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        rng = random.Random(f"{SEED}-{language}-{pages}")
+        vocabulary = VOCABULARY[language]
+        write_pdf(path, [page_lines(rng, vocabulary, page, pages) for page in range(1, pages + 1)])
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the benchmark PDF fixtures.")
+    parser.add_argument("--pages", type=int, nargs="+", default=PAGE_SIZES)
+    parser.add_argument("--language", choices=LANGUAGES, action="append", dest="languages")
+    args = parser.parse_args(argv)
+    for language in args.languages or LANGUAGES:
+        for pages in args.pages:
+            print(fixture_path(pages, language))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Startup benchmark: imports the modules the app loads before its window appears, under
+`python -X importtime`, and fails if that takes longer than the target or pulls in a module
+that is supposed to load on first use.
+
+    python benchmarks/import_time.py            # app modules, without the GUI toolkit
+    python benchmarks/import_time.py -m app     # everything app.py imports
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What app.py imports besides customtkinter/tkinter, whose cost is outside our control
+DEFAULT_MODULES = ["converter", "conversion_worker", "tracker"]
+# Cumulative import time allowed for DEFAULT_MODULES, in milliseconds
+TARGET_MS = 150
+# Heavy modules that must wait until the feature using them is first used
+DEFERRED_MODULES = ["boto3", "pygame", "PyPDF2", "num2words"]
+RUNS = 5
+
+
+def importtime(code):
+    """
+    Yields (name, cumulative microseconds, top level) for each module imported by `code`.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr.strip().splitlines()[-1])
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Nesting shows as two spaces per level after the one separating the column
+        yield name.strip(), int(cumulative_us), len(name) - len(name.lstrip()) == 1
+
+
+def measure(modules, interpreter_modules):
+    """
+    Returns ({module: cumulative microseconds}, total microseconds) for one cold import,
+    leaving out what the interpreter imports on its own before running any code.
+    """
+    cumulative = {}
+    total = 0
+    code = "; ".join(f"import {module}" for module in modules)
+    for name, cumulative_us, top_level in importtime(code):
+        if name in interpreter_modules:
+            continue
+        cumulative[name] = cumulative_us
+        if top_level:
+            total += cumulative_us
+    return cumulative, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how long the app takes to import.")
+    parser.add_argument("-m", "--module", action="append", dest="modules",
+                        help="module to import (repeatable, default: the app's own modules)")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS)
+    parser.add_argument("--runs", type=int, default=RUNS)
+    args = parser.parse_args(argv)
+    modules = args.modules or DEFAULT_MODULES
+
+    # The best run is the least disturbed by the rest of the machine
+    interpreter_modules = {name for name, _, _ in importtime("pass")}
+    runs = [measure(modules, interpreter_modules) for _ in range(args.runs)]
+    cumulative, total = min(runs, key=lambda run: run[1])
+
+    print(f"Import of {', '.join(modules)}: {total / 1000:.1f} ms (target {args.target_ms:.0f} ms)")
+    heaviest = sorted(((us, name) for name, us in cumulative.items()), reverse=True)[:10]
+    for us, name in heaviest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in DEFERRED_MODULES if name in cumulative]
+    if loaded:
+        print(f"Imported at startup but should load on first use: {', '.join(loaded)}")
+        failed = True
+    if total / 1000 > args.target_ms:
+        print("Over target")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
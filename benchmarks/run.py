@@ -0,0 +1,210 @@
+"""
+Benchmark suite: converts the generated PDF fixtures against a local fake Polly endpoint and
+records, per fixture, the throughput of each stage (extraction, preprocessing, chunking),
+the end-to-end conversion time with its JobMetrics report, and peak memory.
+
+    python benchmarks/run.py                              # 10 and 100 pages, both languages
+    python benchmarks/run.py --pages 1000 --latency-ms 300 --throttle-rate 0.05
+    python benchmarks/run.py --compare benchmarks/results/<commit>.json
+    python benchmarks/run.py --tasks --poll-failure-rate 0.2   # asynchronous tasks through fake S3
+
+Results are written as JSON to benchmarks/results/<commit>.json (or -o). Each case runs in
+its own process, with empty caches, so peak RSS and timings are per fixture.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+DEFAULT_PAGES = [10, 100]
+# Bucket of the fake S3, for --tasks
+TASKS_BUCKET = "benchmark"
+VOICES = {"pt-BR": "Camila", "en-US": "Joanna"}
+
+# Figures compared between runs, and whether a higher value is better
+COMPARED = {
+    "extraction_pages_per_second": True,
+    "preprocessing_characters_per_second": True,
+    "chunking_characters_per_second": True,
+    "end_to_end_seconds": False,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(pages, language, tasks=False):
+    """
+    Runs one fixture in this process and returns its results; the environment already points
+    the converter at the fake endpoint and at empty caches.
+    """
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from fixtures import fixture_path
+    from chunker import iter_chunks
+    from converter import MAX_TEXT_LENGTH, PDF_EXTRACT_WORKERS, PREPROCESSORS, convert_pdf
+    from instrumentation import JobMetrics
+    from pdf_extraction import iter_pages
+
+    pdf_path = fixture_path(pages, language)
+    result = {"language": language, "pages": pages}
+
+    started_at = time.perf_counter()
+    texts = list(iter_pages(pdf_path, workers=PDF_EXTRACT_WORKERS))
+    elapsed = time.perf_counter() - started_at
+    result["extraction_pages_per_second"] = len(texts) / elapsed
+    result["extracted_characters"] = sum(len(text) for text in texts)
+
+    preprocess = PREPROCESSORS[language]
+    started_at = time.perf_counter()
+    processed = [preprocess(text) for text in texts]
+    elapsed = time.perf_counter() - started_at
+    result["preprocessing_characters_per_second"] = result["extracted_characters"] / elapsed
+
+    started_at = time.perf_counter()
+    chunks = list(iter_chunks(processed, MAX_TEXT_LENGTH))
+    elapsed = time.perf_counter() - started_at
+    result["chunks"] = len(chunks)
+    result["billed_characters"] = sum(len(chunk) for chunk in chunks)
+    result["chunking_characters_per_second"] = result["billed_characters"] / elapsed
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        metrics = JobMetrics()
+        started_at = time.perf_counter()
+        options = {"s3_bucket": TASKS_BUCKET} if tasks else {"cache": None, "resume": False}
+        convert_pdf(pdf_path, os.path.join(output_dir, "out.mp3"), VOICES[language], language,
+                    metrics=metrics, **options)
+        result["end_to_end_seconds"] = time.perf_counter() - started_at
+        metrics.finish()
+        result["metrics"] = metrics.report()
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def start_fake_polly(args):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_polly.py"),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--throttle-rate", str(args.throttle_rate),
+         "--audio-bytes-per-character", str(args.audio_bytes_per_character),
+         "--poll-failure-rate", str(args.poll_failure_rate)],
+        stdout=subprocess.PIPE, text=True
+    )
+    port = int(process.stdout.readline())
+    return process, f"http://127.0.0.1:{port}"
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(case["language"], case["pages"]): case for case in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (ratio > 1 is better):")
+    for case in results:
+        before = baseline.get((case["language"], case["pages"]))
+        if before is None:
+            continue
+        ratios = []
+        for key, higher_is_better in COMPARED.items():
+            if before.get(key) and case.get(key):
+                ratio = case[key] / before[key] if higher_is_better else before[key] / case[key]
+                ratios.append(f"{key} {ratio:.2f}x")
+        print(f"  {case['language']} {case['pages']} pages: " + ", ".join(ratios))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark conversions against a local fake Polly.")
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES)
+    parser.add_argument("--language", choices=sorted(VOICES), action="append", dest="languages")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Fake Polly latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests throttled")
+    parser.add_argument("--audio-bytes-per-character", type=int, default=400)
+    parser.add_argument("--tasks", action="store_true",
+                        help="Convert with asynchronous synthesis tasks, through the fake S3")
+    parser.add_argument("--poll-failure-rate", type=float, default=0.0,
+                        help="Fraction of task status checks dropped by the fake endpoint")
+    parser.add_argument("--max-tps", type=float, default=50.0, help="POLLY_MAX_TPS for the conversions")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="POLLY_MAX_IN_FLIGHT for the conversions")
+    parser.add_argument("-o", "--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    parser.add_argument("--case", nargs=2, metavar=("PAGES", "LANGUAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(int(args.case[0]), args.case[1], args.tasks)))
+        return 0
+
+    server, endpoint = start_fake_polly(args)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            env = dict(os.environ,
+                       AWS_ENDPOINT_URL_POLLY=endpoint, AWS_ENDPOINT_URL_S3=endpoint, ACCESS_KEY_ID="benchmark", SECRET_ACCESS_KEY="benchmark",
+                       AWS_REGION="us-east-1", POLLY_MAX_TPS=str(args.max_tps),
+                       POLLY_MAX_IN_FLIGHT=str(args.max_in_flight),
+                       AUDIO_CACHE_DIR=os.path.join(state_dir, "audio"), PAGE_CACHE_DIR=os.path.join(state_dir, "pages"),
+                       USAGE_DB_PATH=os.path.join(state_dir, "usage.db"),
+                       VOICE_CATALOG_PATH=os.path.join(state_dir, "voices.json"))
+            for language in args.languages or sorted(VOICES):
+                for pages in args.pages:
+                    command = [sys.executable, __file__, "--case", str(pages), language]
+                    case = subprocess.run(command + (["--tasks"] if args.tasks else []),
+                                          env=env, capture_output=True, text=True)
+                    if case.returncode != 0:
+                        print(case.stderr, file=sys.stderr)
+                        return 1
+                    result = json.loads(case.stdout.strip().splitlines()[-1])
+                    results.append(result)
+                    print(f"{language} {pages:5d} pages: extraction {result['extraction_pages_per_second']:.0f} pages/s, "
+                          f"preprocessing {result['preprocessing_characters_per_second'] / 1000:.0f}k chars/s, "
+                          f"chunking {result['chunking_characters_per_second'] / 1000:.0f}k chars/s, "
+                          f"end to end {result['end_to_end_seconds']:.1f}s, peak RSS {result['peak_rss_mb']:.0f} MB",
+                          flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    commit = current_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "case")},
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import re
+from collections import Counter
+
+# Lines looked at, from the top and the bottom of each page
+EDGE_LINES = 3
+# A line is boilerplate once it is on at least this share of the pages seen, and on MIN_PAGES of them
+MIN_FRACTION = 0.5
+MIN_PAGES = 3
+# Pages held back at the start of a document, before enough are known to tell what repeats
+WINDOW = 16
+
+DIGITS = re.compile(r'\d+')
+
+
+def normalize(line):
+    # "Página 3 de 120" and "Página 4 de 120" are the same line
+    return DIGITS.sub('#', ' '.join(line.split()).lower())
+
+
+class BoilerplateFilter:
+    """
+    Removes running heads, page numbers, copyright footers and similar lines repeated across
+    pages, before they are preprocessed, billed and spoken once per page.
+
+    Only the first and last `edge_lines` non-empty lines of each page are candidates, counted
+    in a frequency index by their normalized form. The first `window` pages are held back until
+    the index has seen them all; later pages are cleaned as they arrive, against the index so far.
+    """
+    def __init__(self, edge_lines=EDGE_LINES, min_fraction=MIN_FRACTION, min_pages=MIN_PAGES, window=WINDOW):
+        self.edge_lines = edge_lines
+        self.min_fraction = min_fraction
+        self.min_pages = min_pages
+        self.window = window
+        self.counts = Counter()
+        self.pages_seen = 0
+        self.characters_removed = 0
+
+    def _edges(self, lines):
+        # Indexes of the first and last non-empty lines
+        filled = [index for index, line in enumerate(lines) if line.strip()]
+        return set(filled[:self.edge_lines] + filled[-self.edge_lines:])
+
+    def _observe(self, lines):
+        self.counts.update({normalize(lines[index]) for index in self._edges(lines)})
+        self.pages_seen += 1
+
+    def is_boilerplate(self, line):
+        count = self.counts[normalize(line)]
+        return count >= self.min_pages and count >= self.min_fraction * self.pages_seen
+
+    def _clean(self, lines):
+        removed = {index for index in self._edges(lines) if self.is_boilerplate(lines[index])}
+        if not removed:
+            return '\n'.join(lines)
+        self.characters_removed += sum(len(lines[index]) for index in removed)
+        return '\n'.join(line for index, line in enumerate(lines) if index not in removed)
+
+    def filter(self, pages):
+        """
+        Yields the text of each page, in order, without its boilerplate lines.
+        """
+        held = []
+        for text in pages:
+            lines = text.split('\n')
+            self._observe(lines)
+            if self.pages_seen <= self.window:
+                held.append(lines)
+                if self.pages_seen == self.window:
+                    yield from (self._clean(page) for page in held)
+                    held = []
+            else:
+                yield self._clean(lines)
+        yield from (self._clean(page) for page in held)
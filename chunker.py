@@ -0,0 +1,98 @@
+import re
+
+# SynthesizeSpeech limits: billed characters and total characters (SSML tags included) per request.
+# For plain text every character is billed, so the billed limit is the one that binds.
+POLLY_MAX_BILLED_CHARACTERS = 3000
+POLLY_MAX_REQUEST_CHARACTERS = 6000
+# The same limits for asynchronous StartSpeechSynthesisTask requests
+POLLY_TASK_MAX_BILLED_CHARACTERS = 100000
+POLLY_TASK_MAX_REQUEST_CHARACTERS = 200000
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+# Boundaries tried, in order, for a sentence that does not fit in one request
+FALLBACK_BREAKS = [
+    re.compile(r'(?<=[,;:])\s+'),  # clauses
+    re.compile(r'\s+'),            # words
+]
+
+# Marks the end of one input text in the sentence stream, for aligned chunking
+TEXT_BOUNDARY = object()
+
+
+def request_limit(max_length=POLLY_MAX_BILLED_CHARACTERS, task=False):
+    if task:
+        return min(max_length, POLLY_TASK_MAX_BILLED_CHARACTERS, POLLY_TASK_MAX_REQUEST_CHARACTERS)
+    return min(max_length, POLLY_MAX_BILLED_CHARACTERS, POLLY_MAX_REQUEST_CHARACTERS)
+
+
+def _pack(pieces, max_length):
+    # Greedily joins pieces with a space while the result still fits in one request
+    current = ""
+    for piece in pieces:
+        if piece is TEXT_BOUNDARY:
+            if current:
+                yield current
+            current = ""
+            continue
+        if not piece:
+            continue
+        if not current:
+            current = piece
+        elif len(current) + 1 + len(piece) <= max_length:
+            current += " " + piece
+        else:
+            yield current
+            current = piece
+    if current:
+        yield current
+
+
+def _fit(piece, max_length, level=0):
+    # Splits an oversize piece at the coarsest boundary that makes it fit
+    if len(piece) <= max_length:
+        yield piece
+    elif level == len(FALLBACK_BREAKS):
+        # A single "word" longer than a request (e.g. a long URL): cut it
+        for start in range(0, len(piece), max_length):
+            yield piece[start:start + max_length]
+    else:
+        parts = FALLBACK_BREAKS[level].split(piece)
+        yield from _pack((fitted for part in parts for fitted in _fit(part, max_length, level + 1)), max_length)
+
+
+def _sentences(texts, max_length, align=False):
+    # The last sentence of each text is held back because it may continue in the next one
+    tail = ""
+    for text in texts:
+        sentences = SENTENCE_BREAK.split(f"{tail} {text}".strip())
+        tail = sentences.pop()
+        if len(tail) > max_length:
+            # Already too long for one request, so it will be split anyway
+            sentences.append(tail)
+            tail = ""
+        for sentence in sentences:
+            yield from _fit(sentence, max_length)
+        if align:
+            yield TEXT_BOUNDARY
+    if tail:
+        yield from _fit(tail, max_length)
+
+
+def iter_chunks(texts, max_length=POLLY_MAX_BILLED_CHARACTERS, task=False, align=False):
+    """
+    Packs a stream of texts (e.g. one per page) into as few Polly requests as possible.
+
+    Sentences are kept whole when they fit; longer ones are split at clause and then word
+    boundaries. Chunks are never empty and never longer than `max_length` or Polly's limits
+    (those of synthesis tasks when `task` is set).
+
+    With `align`, a chunk never packs sentences from two texts (a sentence that continues on
+    the next text goes with it), so editing one page only changes the chunks of that page and
+    possibly the next, instead of shifting every chunk boundary after it.
+    """
+    max_length = request_limit(max_length, task)
+    yield from _pack(_sentences(texts, max_length, align), max_length)
+
+
+def split_text(text, max_length=POLLY_MAX_BILLED_CHARACTERS):
+    return list(iter_chunks([text], max_length))
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from converter import LANGUAGES, POLLY_MAX_TPS, POLLY_S3_BUCKET, convert_pdf
+from instrumentation import JobMetrics
+from planner import format_plan, plan_conversion
+from synthesis import RateLimiter
+from tracker import PollyUsageTracker
+
+
+def resolve_language(language):
+    # Accept both the GUI names ("Portuguese") and the Polly codes ("pt-BR")
+    if language in LANGUAGES:
+        return LANGUAGES[language]
+    if language in LANGUAGES.values():
+        return language
+    raise ValueError(f"Unsupported language: {language}")
+
+
+def load_jobs(args):
+    defaults = {
+        "voice": args.voice,
+        "language": args.language,
+        "start_page": args.start_page,
+        "end_page": args.end_page,
+    }
+    jobs = []
+    for source in args.inputs:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(".pdf"):
+                    jobs.append(dict(defaults, pdf=os.path.join(source, name)))
+        elif source.lower().endswith(".json"):
+            # Manifest: a list of {"pdf", "output", "voice", "language", "start_page", "end_page"}
+            base_dir = os.path.dirname(os.path.abspath(source))
+            with open(source, "r") as f:
+                for entry in json.load(f):
+                    job = dict(defaults, **{k: v for k, v in entry.items() if v is not None})
+                    job["pdf"] = os.path.join(base_dir, job["pdf"])
+                    if job.get("output"):
+                        job["output"] = os.path.join(base_dir, job["output"])
+                    jobs.append(job)
+        else:
+            jobs.append(dict(defaults, pdf=source))
+
+    outputs = {}
+    for job in jobs:
+        if not job.get("output"):
+            name = os.path.splitext(os.path.basename(job["pdf"]))[0] + "." + args.format
+            job["output"] = os.path.join(args.output_dir or os.path.dirname(job["pdf"]), name)
+        # Jobs writing the same output would share its .part and .job files and corrupt each other
+        output = os.path.abspath(job["output"])
+        if output in outputs:
+            raise ValueError(f"{job['pdf']} and {outputs[output]} would both be written to {job['output']}")
+        outputs[output] = job["pdf"]
+        if not job.get("voice"):
+            raise ValueError(f"No voice given for {job['pdf']}")
+        job["language_code"] = resolve_language(job["language"])
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PDFs to speech with Amazon Polly, without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories of PDFs or JSON manifests")
+    parser.add_argument("-v", "--voice", help="Polly voice id, e.g. Camila or Joanna")
+    parser.add_argument("-l", "--language", default="pt-BR", help="Language name or code (default: pt-BR)")
+    parser.add_argument("-o", "--output-dir", help="Where to write the audio files (default: next to each PDF)")
+    parser.add_argument("-f", "--format", choices=["mp3", "wav"], default="mp3", help="Output audio format (default: mp3)")
+    parser.add_argument("--start-page", type=int)
+    parser.add_argument("--end-page", type=int)
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="PDFs converted at the same time (default: 2)")
+    parser.add_argument("--s3-bucket", default=POLLY_S3_BUCKET,
+                        help="Synthesize with asynchronous Polly tasks through this S3 bucket (for very long documents)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Write a timing report next to each output as <output>.metrics.json")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only show what each conversion would take (chunks, characters, cost, time), without synthesizing")
+    parser.add_argument("--confirm", action="store_true", help="Show the plan and ask before converting")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only report finished and failed jobs")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error("No PDF files found")
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.plan or args.confirm:
+        usage_tracker = PollyUsageTracker()
+        plans = []
+        for job in jobs:
+            try:
+                plan = plan_conversion(job["pdf"], job["output"], job["voice"], job["language_code"],
+                                       job.get("start_page"), job.get("end_page"), usage=usage_tracker)
+            except Exception as e:
+                usage_tracker.close()
+                print(f"FAILED {job['pdf']}: {e}", file=sys.stderr)
+                return 1
+            plans.append(plan)
+            print(f"{job['pdf']}:\n  " + format_plan(plan).replace("\n", "\n  "), flush=True)
+        usage_tracker.close()
+        if len(plans) > 1:
+            # Jobs run args.jobs at a time, under one shared request rate
+            print(f"Total: {sum(plan['requests'] for plan in plans)} requests, "
+                  f"{sum(sum(plan['billed_characters'].values()) for plan in plans)} billed characters, "
+                  f"${sum(plan['cost'] for plan in plans):.2f}")
+        if args.plan:
+            return 0
+        if input("Convert? Narrow the range with --start-page/--end-page otherwise. [y/N] ").strip().lower() not in ("y", "yes"):
+            return 1
+
+    # All jobs share one request budget so running several at once stays under the Polly quota
+    rate_limiter = RateLimiter(POLLY_MAX_TPS)
+    print_lock = threading.Lock()
+
+    def report(message):
+        with print_lock:
+            print(message, flush=True)
+
+    def run(number, job):
+        label = f"[{number}/{len(jobs)}] {os.path.basename(job['pdf'])}"
+
+        def progress(pages_extracted, pages_total, chunks_synthesized, bytes_written):
+            if not args.quiet:
+                report(f"{label}: {pages_extracted}/{pages_total} pages, {chunks_synthesized} chunks, "
+                       f"{bytes_written / 1024:.0f} KB")
+
+        if args.s3_bucket:
+            options = {"s3_bucket": args.s3_bucket}
+        else:
+            options = {"rate_limiter": rate_limiter}
+        metrics = JobMetrics() if args.metrics else None
+        characters = convert_pdf(job["pdf"], job["output"], job["voice"], job["language_code"],
+                                 job.get("start_page"), job.get("end_page"), progress=progress,
+                                 usage=usage_tracker, metrics=metrics, **options)
+        if metrics is not None:
+            metrics.finish()
+            metrics.dump(job["output"] + ".metrics.json")
+        return characters
+
+    # Every chunk is recorded in the usage ledger as it is synthesized
+    usage_tracker = PollyUsageTracker()
+    usage_tracker.load_from_file()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(run, number, job): job for number, job in enumerate(jobs, start=1)}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                characters = future.result()
+            except Exception as e:
+                failures += 1
+                report(f"FAILED {job['pdf']}: {e}")
+            else:
+                report(f"OK {job['pdf']} -> {job['output']} ({characters} chars)")
+    usage_tracker.close()
+
+    report(f"{len(jobs) - failures} of {len(jobs)} conversions succeeded")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
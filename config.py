@@ -0,0 +1,74 @@
+import os
+from dotenv import load_dotenv
+
+# Carrega o conteúdo do arquivo .env, uma única vez para toda a aplicação
+load_dotenv()
+
+CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "tts-pdf")
+
+# Acessa as variáveis de ambiente
+AWS_KEY = os.getenv("ACCESS_KEY_ID")
+AWS_SECRET = os.getenv("SECRET_ACCESS_KEY")
+AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
+
+# Synthesis concurrency and request rate (keep under the account's Polly TPS quota)
+POLLY_MAX_IN_FLIGHT = int(os.getenv("POLLY_MAX_IN_FLIGHT", "4"))
+POLLY_MAX_TPS = float(os.getenv("POLLY_MAX_TPS", "8"))
+# HTTP connections kept open per client; leave room for several conversions sharing the client
+POLLY_MAX_POOL_CONNECTIONS = int(os.getenv("POLLY_MAX_POOL_CONNECTIONS", str(max(10, 4 * POLLY_MAX_IN_FLIGHT))))
+
+# Cache of synthesized chunks, so re-conversions only pay for text that changed
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(CACHE_ROOT, "audio"))
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "500"))
+
+# PDF text extraction: worker processes (0 = one per CPU) and per-page text cache
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(CACHE_ROOT, "pages"))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "100"))
+
+# S3 bucket for asynchronous synthesis tasks (used by the CLI's --s3-bucket)
+POLLY_S3_BUCKET = os.getenv("POLLY_S3_BUCKET")
+POLLY_S3_PREFIX = os.getenv("POLLY_S3_PREFIX", "tts-pdf/")
+
+# Voice catalog kept on disk, so the app starts without waiting for describe_voices
+VOICE_CATALOG_PATH = os.getenv("VOICE_CATALOG_PATH", os.path.join(CACHE_ROOT, "voices.json"))
+VOICE_CATALOG_TTL_HOURS = float(os.getenv("VOICE_CATALOG_TTL_HOURS", "24"))
+
+# Reuse unchanged audio when a revised PDF is converted again to the same file. Aligning
+# chunks to pages guarantees an edit only affects its own pages, at the cost of more requests
+INCREMENTAL_CONVERSION = os.getenv("INCREMENTAL_CONVERSION", "1") != "0"
+ALIGN_CHUNKS_TO_PAGES = os.getenv("ALIGN_CHUNKS_TO_PAGES", "0") == "1"
+
+# Polly prices in USD per million billed characters, for the conversion planner's estimates
+POLLY_PRICE_STANDARD = float(os.getenv("POLLY_PRICE_STANDARD", "4.00"))
+POLLY_PRICE_NEURAL = float(os.getenv("POLLY_PRICE_NEURAL", "16.00"))
+
+# Local conversion service (service.py); the GUI submits its jobs there when
+# CONVERSION_SERVICE_URL is set (http://host:port or unix:///path/to/socket)
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+SERVICE_DATA_DIR = os.getenv("SERVICE_DATA_DIR", os.path.join(CACHE_ROOT, "service"))
+# Folders the service may read PDFs from by path (os.pathsep separated); otherwise they are uploaded
+SERVICE_INPUT_DIRS = [path for path in os.getenv("SERVICE_INPUT_DIRS", "").split(os.pathsep) if path]
+# Finished jobs, with their audio, are forgotten after this long
+SERVICE_JOB_RETENTION_HOURS = float(os.getenv("SERVICE_JOB_RETENTION_HOURS", "24"))
+CONVERSION_SERVICE_URL = os.getenv("CONVERSION_SERVICE_URL")
+
+# Usage ledger (SQLite), one entry per synthesized chunk
+USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", "polly_usage.db")
+
+# Text preprocessing
+# Drop lines repeated across pages (running heads, page numbers, footers) before synthesis
+STRIP_BOILERPLATE = os.getenv('STRIP_BOILERPLATE', '1') != '0'
+PAUSE_LONG = os.getenv('PAUSE_LONG', '1s')
+PAUSE_SHORT = os.getenv('PAUSE_SHORT', '500ms')
+PROSODY_RATE = os.getenv('PROSODY_RATE', 'medium')
+EMPHASIS_LEVEL = os.getenv('EMPHASIS_LEVEL', 'strong')
+MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', '3000'))
+
+# Palavras-chave para ênfase e trechos para ajuste de velocidade, por idioma
+KEYWORDS_PT_BR = os.getenv('KEYWORDS', 'importante,atenção,observe,veículos').split(',')
+KEYWORDS_EN_US = os.getenv('KEYWORDS_EN', 'important,attention,note,vehicles').split(',')
+SLOW_RATE_PHRASES_PT_BR = os.getenv('SLOW_RATE_PHRASES', 'Fundos de Tijolo,Fundos de Papel,Fundos Híbridos,Fundos de Desenvolvimento').split(',')
+SLOW_RATE_PHRASES_EN_US = os.getenv('SLOW_RATE_PHRASES_EN', 'Brick Funds,Paper Funds,Hybrid Funds,Development Funds').split(',')
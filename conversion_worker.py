@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+
+from converter import ConversionCancelled, convert_pdf
+from instrumentation import JobMetrics
+from planner import plan_conversion
+
+
+class ConversionWorker(threading.Thread):
+    """
+    Runs convert_pdf off the UI thread and reports through `events`, a thread-safe queue of dicts:
+
+    - {"type": "progress", "pages_extracted", "pages_total", "chunks_synthesized", "bytes_written", "eta"}
+    - {"type": "audio", "audio", "duration"}, for each chunk in order, when `stream` is set
+    - {"type": "done", "characters", "report"}
+    - {"type": "cancelled"}
+    - {"type": "error", "message"}
+
+    `report` is the job's JobMetrics report (stage timings, chunk latency, cache hit rate).
+    `eta` is the estimated seconds left (None until there is enough to go on). The UI polls the
+    queue, e.g. with Tk's `after`, and calls cancel() to stop between chunks.
+    """
+    def __init__(self, pdf_path, output_file, voice_id, language_code, start_page=None, end_page=None,
+                 stream=False, **options):
+        super().__init__(daemon=True)
+        self.voice_id = voice_id
+        self.args = (pdf_path, output_file, voice_id, language_code, start_page, end_page)
+        self.options = options
+        if stream:
+            self.options["on_audio"] = self._audio
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.metrics = JobMetrics()
+        self.started_at = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _progress(self, pages_extracted, pages_total, chunks_synthesized, bytes_written):
+        eta = None
+        elapsed = time.monotonic() - self.started_at
+        if pages_total and pages_extracted:
+            # Extraction runs only a few chunks ahead of synthesis, so pages track overall progress
+            eta = elapsed / pages_extracted * (pages_total - pages_extracted)
+        self.events.put({
+            "type": "progress",
+            "pages_extracted": pages_extracted,
+            "pages_total": pages_total,
+            "chunks_synthesized": chunks_synthesized,
+            "bytes_written": bytes_written,
+            "eta": eta,
+        })
+
+    def _audio(self, audio, duration):
+        self.events.put({"type": "audio", "audio": audio, "duration": duration})
+
+    def run(self):
+        self.started_at = time.monotonic()
+        try:
+            characters = convert_pdf(*self.args, progress=self._progress, cancel=self.cancel_event,
+                                     metrics=self.metrics, **self.options)
+        except ConversionCancelled:
+            self.events.put({"type": "cancelled"})
+        except Exception as e:
+            self.events.put({"type": "error", "message": str(e)})
+        else:
+            self.metrics.finish()
+            self.events.put({"type": "done", "characters": characters, "report": self.metrics.report()})
+
+
+class PlanWorker(threading.Thread):
+    """
+    Runs plan_conversion off the UI thread; `events` gets {"type": "plan", "plan"} or
+    {"type": "error", "message"}.
+    """
+    def __init__(self, pdf_path, output_file, voice_id, language_code, start_page=None, end_page=None, **options):
+        super().__init__(daemon=True)
+        self.args = (pdf_path, output_file, voice_id, language_code, start_page, end_page)
+        self.options = options
+        self.events = queue.Queue()
+
+    def run(self):
+        try:
+            plan = plan_conversion(*self.args, **self.options)
+        except Exception as e:
+            self.events.put({"type": "error", "message": str(e)})
+        else:
+            self.events.put({"type": "plan", "plan": plan})
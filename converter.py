@@ -0,0 +1,409 @@
+import itertools
+import json
+import os
+import threading
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+from text_preprocessor_pt_br import preprocess_text_pt_br
+from text_preprocessor_en_us import preprocess_text_en_us_extended, MAX_TEXT_LENGTH
+from synthesis import SynthesisEngine, UNSUPPORTED_ENGINE, ConversionCancelled, classify_error
+from audio_cache import AudioCache, chunk_key
+from chunker import POLLY_TASK_MAX_BILLED_CHARACTERS, iter_chunks
+from pdf_extraction import PageTextCache, count_pages, iter_pages
+from job_manifest import JobManifest
+from audio_assembly import OUTPUT_FORMATS, AudioAssembler, SegmentBuffer, audio_view
+from polly_tasks import synthesize_with_tasks
+from voice_catalog import IncompleteCatalog, VoiceCatalog
+from instrumentation import NO_METRICS
+from boilerplate import BoilerplateFilter
+from number_words import cache_info as number_cache_info
+from config import (
+    AWS_KEY, AWS_SECRET, AWS_REGION, POLLY_MAX_IN_FLIGHT, POLLY_MAX_TPS, POLLY_MAX_POOL_CONNECTIONS,
+    AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB, PDF_EXTRACT_WORKERS, PAGE_CACHE_DIR, PAGE_CACHE_MAX_MB, POLLY_S3_BUCKET,
+    POLLY_S3_PREFIX,
+    VOICE_CATALOG_PATH, VOICE_CATALOG_TTL_HOURS, STRIP_BOILERPLATE, INCREMENTAL_CONVERSION,
+    ALIGN_CHUNKS_TO_PAGES
+)
+
+AUDIO_CACHE = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024)
+PAGE_CACHE = PageTextCache(PAGE_CACHE_DIR, PAGE_CACHE_MAX_MB * 1024 * 1024)
+
+LANGUAGES = {
+    "Portuguese": "pt-BR",
+    "English": "en-US"
+}
+
+# Voices that rejected the neural engine, so later chunks go straight to standard
+STANDARD_ONLY_VOICES = set()
+
+PREPROCESSORS = {
+    "pt-BR": preprocess_text_pt_br,
+    "en-US": preprocess_text_en_us_extended
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(service_name, retries=True):
+    """
+    Returns the shared client for an AWS service, created on first use. Clients are thread-safe
+    and keep their connections alive, so conversions and voice tests reuse the same TLS sessions.
+    With `retries` off, botocore makes a single attempt per call: for calls made through a
+    SynthesisEngine, which retries throttling itself, adapting its concurrency; botocore retrying
+    the same errors underneath would hide the throttling from it.
+    """
+    with _clients_lock:
+        if (service_name, retries) not in _clients:
+            # boto3 takes a good part of a second to import, so it waits for the first AWS call
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.Session(
+                aws_access_key_id=AWS_KEY,
+                aws_secret_access_key=AWS_SECRET,
+                region_name=AWS_REGION
+            )
+            config = Config(
+                max_pool_connections=POLLY_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                retries={"mode": "standard"} if retries else {"mode": "standard", "total_max_attempts": 1}
+            )
+            _clients[service_name, retries] = session.client(service_name, config=config)
+        return _clients[service_name, retries]
+
+def get_voice_capabilities():
+    polly_client = get_client('polly')
+
+    voices = {}
+    failed = {}
+    for lang_name, lang_code in LANGUAGES.items():
+        try:
+            response = polly_client.describe_voices(LanguageCode=lang_code)
+            for voice in response['Voices']:
+                voices[voice['Id']] = {
+                    'language': lang_name,
+                    'gender': voice['Gender'],
+                    'engine': voice['SupportedEngines']
+                }
+        except (BotoCoreError, ClientError) as error:
+            print(f"Erro ao obter vozes para {lang_name}: {error}")
+            failed[lang_name] = str(error)
+
+    if failed:
+        # Uma lista parcial não pode substituir o catálogo inteiro
+        raise IncompleteCatalog(voices, failed)
+    return voices
+
+VOICE_CATALOG = VoiceCatalog(VOICE_CATALOG_PATH, VOICE_CATALOG_TTL_HOURS * 3600, get_voice_capabilities)
+
+def seed_engine_support(voice_id):
+    # Voices the catalog lists without neural support skip the neural attempt altogether
+    engines = VOICE_CATALOG.engines(voice_id)
+    if engines is not None and "neural" not in engines:
+        STANDARD_ONLY_VOICES.add(voice_id)
+
+def iter_pdf_pages(pdf_path, start_page=None, end_page=None, workers=PDF_EXTRACT_WORKERS, cache=PAGE_CACHE):
+    return iter_pages(pdf_path, start_page, end_page, workers=workers, cache=cache)
+
+def extract_text_from_pdf(pdf_path, start_page=None, end_page=None, **options):
+    return ''.join(iter_pdf_pages(pdf_path, start_page, end_page, **options))
+
+def load_previous_segments(output_file):
+    """
+    Returns {chunk hash: (offset, length)} for the audio of an earlier conversion to
+    output_file, read from its index, or {} if there is none or the file no longer matches it.
+    """
+    try:
+        with open(output_file + ".index.json", 'r') as f:
+            index = json.load(f)
+        if index.get("bytes") != os.path.getsize(output_file):
+            return {}
+    except (OSError, ValueError):
+        return {}
+    return {segment["hash"]: (segment["offset"], segment["length"])
+            for segment in index.get("segments", []) if segment.get("hash")}
+
+def synthesize_chunks(chunks, output_file, voice_id, language_code,
+                      max_in_flight=POLLY_MAX_IN_FLIGHT, max_tps=POLLY_MAX_TPS, cache=AUDIO_CACHE,
+                      rate_limiter=None, progress=None, resume=True, cancel=None, on_audio=None, usage=None, metrics=None,
+                      reuse_previous=True, write_index=True):
+    """
+    Synthesizes a stream of text chunks and appends the audio to output_file as it arrives,
+    joined into a single stream (MP3, or WAV for a .wav output_file) with a segment index
+    written next to it as <output_file>.index.json (unless `write_index` is off, e.g. for throwaway output).
+    `progress`, if given, is called after each chunk with chunks_synthesized and bytes_written.
+    With `resume`, a failed run leaves its partial audio and a job manifest behind, and the
+    next run with the same text and voice only synthesizes the chunks that are missing.
+    Setting the `cancel` event stops the run between chunks with ConversionCancelled.
+    `on_audio`, if given, is called in order with each chunk's audio (bytes in the output format,
+    PCM without a WAV header) and its duration in seconds, so playback can start before the
+    whole file is written.
+    `usage`, if given, is a PollyUsageTracker that gets one entry per chunk (engine, latency, cache hit).
+    `metrics`, if given, is a JobMetrics that times each stage and records chunk latencies.
+    With `reuse_previous`, chunks whose text and voice settings are unchanged since the last
+    conversion to output_file are copied from it instead of synthesized again.
+    Returns the number of characters sent for synthesis (chunks reused from a previous run or
+    found in the cache excluded).
+    """
+    polly_client = get_client('polly', retries=False)
+    seed_engine_support(voice_id)
+    metrics = metrics if metrics is not None else NO_METRICS
+
+    audio_format, sample_rate = OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), OUTPUT_FORMATS[".mp3"])
+
+    def key_for(part):
+        # A chave usa o motor solicitado; o fallback para standard é determinístico por voz
+        return chunk_key(part, voice_id, "neural", language_code, sample_rate, audio_format)
+
+    previous_segments = load_previous_segments(output_file) if reuse_previous else {}
+
+    def previous_audio(key):
+        offset, length = previous_segments[key]
+        try:
+            with open(output_file, 'rb') as f:
+                f.seek(offset)
+                audio = f.read(length)
+        except OSError:
+            return None
+        return audio if len(audio) == length else None
+
+    def resolve(part):
+        # Audio available without Polly, from the previous output or the cache; None otherwise.
+        # Runs outside the engine's rate limit, so reruns and cached jobs go at disk speed.
+        # Runs in the caller's thread, after counted() has counted the part
+        nonlocal characters
+        key = key_for(part)
+        metrics.count("characters", len(part))
+        if key in previous_segments:
+            with metrics.span("reuse"):
+                audio = previous_audio(key)
+            if audio is not None:
+                metrics.count("reused_chunks")
+                if usage is not None:
+                    engine = "standard" if voice_id in STANDARD_ONLY_VOICES else "neural"
+                    usage.add_entry(len(part), voice_id, engine, cache_hit=True, job=output_file)
+                characters -= len(part)
+                return key, audio
+
+        with metrics.span("cache"):
+            audio = cache.get(key) if cache is not None else None
+        if cache is not None:
+            metrics.count("cache_hits" if audio is not None else "cache_misses")
+        if audio is not None:
+            if usage is not None:
+                engine = "standard" if voice_id in STANDARD_ONLY_VOICES else "neural"
+                usage.add_entry(len(part), voice_id, engine, cache_hit=True, job=output_file)
+            characters -= len(part)
+            return key, audio
+        return None
+
+    def synthesize(part):
+        key = key_for(part)
+        started_at = time.monotonic()
+        with metrics.span("synthesis"):
+            audio, engine = synthesize_uncached(part)
+        latency = time.monotonic() - started_at
+        metrics.observe("chunk_latency", latency)
+        metrics.count("requests")
+        if usage is not None:
+            usage.add_entry(len(part), voice_id, engine, latency=latency, job=output_file)
+        if cache is not None:
+            with metrics.span("cache"), audio_view(audio) as view:
+                cache.put(key, view)
+        return key, audio
+
+    def synthesize_uncached(part):
+        if voice_id not in STANDARD_ONLY_VOICES:
+            try:
+                # Tenta primeiro com o motor neural
+                response = polly_client.synthesize_speech(
+                    Text=part,
+                    TextType="text",
+                    OutputFormat=audio_format,
+                    VoiceId=voice_id,
+                    LanguageCode=language_code,
+                    Engine="neural",
+                    SampleRate=sample_rate
+                )
+                return SegmentBuffer.from_stream(response['AudioStream']), "neural"
+            except ClientError as e:
+                if classify_error(e) != UNSUPPORTED_ENGINE:
+                    raise
+                # Lembra da voz para não repetir a chamada neural nos próximos trechos
+                STANDARD_ONLY_VOICES.add(voice_id)
+
+        # Se falhar com neural, tenta com standard
+        response = polly_client.synthesize_speech(
+            Text=part,
+            TextType="text",
+            OutputFormat=audio_format,
+            VoiceId=voice_id,
+            LanguageCode=language_code,
+            Engine="standard",
+            SampleRate=sample_rate
+        )
+        return SegmentBuffer.from_stream(response['AudioStream']), "standard"
+
+    characters = 0
+
+    def check_cancelled():
+        if cancel is not None and cancel.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+
+    def counted(chunks):
+        nonlocal characters
+        for chunk in chunks:
+            check_cancelled()
+            characters += len(chunk)
+            yield chunk
+
+    # Escreve num arquivo temporário para não deixar um áudio incompleto em caso de falha
+    partial_file = output_file + ".part"
+    manifest = JobManifest(output_file + ".job", {"voice_id": voice_id, "language_code": language_code,
+                                                  "format": audio_format, "sample_rate": sample_rate})
+    try:
+        previous = []
+        if resume and os.path.exists(partial_file):
+            previous = manifest.load(os.path.getsize(partial_file))
+
+        # Reaproveita os trechos de uma execução anterior enquanto o texto continuar o mesmo
+        chunks = counted(metrics.timed(chunks, "chunking"))
+        reused = []
+        for chunk in chunks:
+            if len(reused) < len(previous) and previous[len(reused)]["hash"] == key_for(chunk):
+                reused.append(previous[len(reused)])
+                characters -= len(chunk)
+            else:
+                chunks = itertools.chain([chunk], chunks)
+                break
+
+        bytes_written = reused[-1]["offset"] + reused[-1]["length"] if reused else 0
+        manifest.start(reused)
+
+        # Sintetizar as partes em paralelo, gravando na ordem original conforme chegam
+        engine = SynthesisEngine(max_in_flight=max_in_flight, max_tps=max_tps, rate_limiter=rate_limiter)
+        with open(partial_file, 'r+b' if reused else 'wb') as file:
+            file.truncate(bytes_written)
+            if on_audio:
+                for entry in reused:
+                    file.seek(entry["offset"])
+                    on_audio(file.read(entry["length"]), entry.get("duration", 0.0))
+            file.seek(bytes_written)
+            assembler = AudioAssembler(file, audio_format, sample_rate, bytes_written, reused)
+            results = metrics.timed(engine.map(synthesize, chunks, local=resolve), "waiting")
+            for index, (key, audio) in enumerate(results, start=len(reused) + 1):
+                with metrics.span("writing"):
+                    segment = assembler.add(audio, key)
+                    file.flush()
+                    manifest.record(key, segment["offset"], segment["length"], segment["duration"])
+                if on_audio:
+                    with audio_view(audio) as view:
+                        on_audio(bytes(view), segment["duration"])
+                if isinstance(audio, SegmentBuffer):
+                    audio.close()
+                if progress:
+                    progress(chunks_synthesized=index, bytes_written=assembler.offset)
+                check_cancelled()
+            assembler.finish()
+        os.replace(partial_file, output_file)
+        if write_index:
+            assembler.write_index(output_file + ".index.json")
+        manifest.remove()
+
+    except (BotoCoreError, ClientError) as error:
+        raise Exception(f"Falha ao sintetizar fala: {error}")
+    finally:
+        manifest.close()
+        if not resume:
+            manifest.remove()
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+
+    return characters
+
+def text_to_speech(text, output_file, voice_id, language_code, **options):
+    # Dividir o texto em partes menores
+    return synthesize_chunks(iter_chunks([text], MAX_TEXT_LENGTH), output_file, voice_id, language_code, **options)
+
+def iter_processed_pages(pdf_path, language_code, start_page=None, end_page=None, extract_workers=PDF_EXTRACT_WORKERS,
+                         strip_boilerplate=STRIP_BOILERPLATE, metrics=None, on_page=None):
+    """
+    Yields the preprocessed text of each page in the range, in order, ready for chunking.
+    With `strip_boilerplate`, lines repeated across pages (running heads, page numbers,
+    footers) are removed first; the characters saved are counted in `metrics` as
+    "boilerplate_characters_removed". `on_page`, if given, is called as each page is extracted.
+    """
+    if language_code not in PREPROCESSORS:
+        raise ValueError(f"Unsupported language code: {language_code}")
+    preprocess = PREPROCESSORS[language_code]
+    metrics = metrics if metrics is not None else NO_METRICS
+
+    def extracted_pages():
+        pages = iter_pdf_pages(pdf_path, start_page, end_page, workers=extract_workers)
+        for page in metrics.timed(pages, "extraction"):
+            if on_page:
+                on_page()
+            yield page
+
+    pages = extracted_pages()
+    numbers_before = number_cache_info()
+    boilerplate = BoilerplateFilter() if strip_boilerplate else None
+    if boilerplate is not None:
+        pages = metrics.timed(boilerplate.filter(pages), "boilerplate")
+    for page in pages:
+        with metrics.span("preprocessing"):
+            text = preprocess(page)
+        yield text
+    if boilerplate is not None:
+        metrics.count("boilerplate_characters_removed", boilerplate.characters_removed)
+    # The number cache is shared by the whole process, so concurrent jobs blur these a little
+    numbers_after = number_cache_info()
+    metrics.count("number_cache_hits", numbers_after["hits"] - numbers_before["hits"])
+    metrics.count("number_cache_misses", numbers_after["misses"] - numbers_before["misses"])
+
+def convert_pdf(pdf_path, output_file, voice_id, language_code, start_page=None, end_page=None,
+                extract_workers=PDF_EXTRACT_WORKERS, progress=None, s3_bucket=None, metrics=None,
+                strip_boilerplate=STRIP_BOILERPLATE, incremental=INCREMENTAL_CONVERSION,
+                align_pages=ALIGN_CHUNKS_TO_PAGES, **options):
+    """
+    Streams a PDF through extraction, preprocessing, chunking and synthesis one page at a time,
+    so memory use does not grow with the length of the document.
+    `progress`, if given, is called after each chunk with pages_extracted, pages_total,
+    chunks_synthesized and bytes_written.
+    With `s3_bucket`, the text is synthesized in a few large asynchronous Polly tasks whose
+    results go through that bucket, instead of one request per chunk.
+    `metrics`, if given, is a JobMetrics that times extraction, preprocessing and synthesis.
+    `strip_boilerplate` removes lines repeated across pages before preprocessing.
+    With `incremental`, unchanged chunks are copied from the previous conversion to output_file,
+    so converting a revised PDF again only synthesizes the text that changed. `align_pages`
+    keeps chunks within page boundaries, so an edit can never shift the chunks after it.
+    Returns the number of characters sent for synthesis.
+    """
+    if language_code not in PREPROCESSORS:
+        raise ValueError(f"Unsupported language code: {language_code}")
+    pages_total = count_pages(pdf_path, start_page, end_page) if progress else None
+    pages_extracted = 0
+
+    def page_extracted():
+        nonlocal pages_extracted
+        pages_extracted += 1
+
+    def processed_pages():
+        return iter_processed_pages(pdf_path, language_code, start_page, end_page, extract_workers,
+                                    strip_boilerplate, metrics, page_extracted)
+
+    def report(**counts):
+        progress(pages_extracted=pages_extracted, pages_total=pages_total, **counts)
+
+    if s3_bucket:
+        seed_engine_support(voice_id)
+        chunks = iter_chunks(processed_pages(), POLLY_TASK_MAX_BILLED_CHARACTERS, task=True)
+        return synthesize_with_tasks(chunks, output_file, voice_id, language_code,
+                                     get_client('polly', retries=False), get_client('s3'), s3_bucket, POLLY_S3_PREFIX,
+                                     standard_only_voices=STANDARD_ONLY_VOICES,
+                                     progress=report if progress else None, metrics=metrics, **options)
+
+    chunks = iter_chunks(processed_pages(), MAX_TEXT_LENGTH, align=align_pages)
+    return synthesize_chunks(chunks, output_file, voice_id, language_code,
+                             progress=report if progress else None, metrics=metrics,
+                             reuse_previous=incremental, **options)
@@ -0,0 +1,142 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an unsorted list; None when there is nothing to rank
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class JobMetrics:
+    """
+    Timing and counters for one conversion.
+
+    span(stage) measures a block of work; spans nested in the same thread are subtracted from
+    the enclosing one, so each stage reports only its own time even when stages are chained
+    generators (chunking pulls preprocessing, which pulls extraction). count() adds to a
+    counter and observe() records a sample, such as the Polly latency of one chunk.
+    """
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.stages = {}
+        self.counters = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def span(self, stage):
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # time spent in nested spans
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self.lock:
+                count, seconds = self.stages.get(stage, (0, 0.0))
+                self.stages[stage] = (count + 1, seconds + elapsed - nested)
+
+    def timed(self, iterable, stage):
+        """
+        Yields from iterable, timing each step under `stage`.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.span(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def observe(self, sample, value):
+        with self.lock:
+            self.samples.setdefault(sample, []).append(value)
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def report(self):
+        """
+        Returns the job's report as a JSON-serializable dict.
+        """
+        wall_seconds = (self.finished_at or time.monotonic()) - self.started_at
+        with self.lock:
+            stages = {stage: {"count": count, "seconds": seconds} for stage, (count, seconds) in self.stages.items()}
+            counters = dict(self.counters)
+            latencies = list(self.samples.get("chunk_latency", []))
+        hits = counters.get("cache_hits", 0)
+        lookups = hits + counters.get("cache_misses", 0)
+        return {
+            "wall_seconds": wall_seconds,
+            "stages": stages,
+            "counters": counters,
+            "chunk_latency_p50": percentile(latencies, 0.50),
+            "chunk_latency_p95": percentile(latencies, 0.95),
+            "characters_per_second": counters.get("characters", 0) / wall_seconds if wall_seconds > 0 else 0.0,
+            "cache_hit_rate": hits / lookups if lookups else None,
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class NoMetrics:
+    """
+    Stand-in used when a job is not being measured; every call is a no-op.
+    """
+    _span = nullcontext()
+
+    def span(self, stage):
+        return self._span
+
+    def timed(self, iterable, stage):
+        return iterable
+
+    def count(self, counter, amount=1):
+        pass
+
+    def observe(self, sample, value):
+        pass
+
+
+NO_METRICS = NoMetrics()
+
+
+def format_report(report):
+    # Human-readable summary, e.g. for the admin panel
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    lines = [f"Wall time: {report['wall_seconds']:.1f}s",
+             f"Characters/s: {report['characters_per_second']:.0f}",
+             f"Chunk latency p50/p95: {seconds(report['chunk_latency_p50'])} / {seconds(report['chunk_latency_p95'])}"]
+    if report["cache_hit_rate"] is not None:
+        lines.append(f"Cache hit rate: {report['cache_hit_rate']:.0%}")
+    if report["counters"].get("reused_chunks"):
+        lines.append(f"Reused from previous output: {report['counters']['reused_chunks']} chunks")
+    number_lookups = report["counters"].get("number_cache_hits", 0) + report["counters"].get("number_cache_misses", 0)
+    if number_lookups:
+        lines.append(f"Number cache hit rate: {report['counters']['number_cache_hits'] / number_lookups:.0%}"
+                     f" of {number_lookups}")
+    if report["counters"].get("boilerplate_characters_removed"):
+        lines.append(f"Boilerplate removed: {report['counters']['boilerplate_characters_removed']} chars")
+    for stage, totals in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(f"  {stage}: {totals['seconds']:.2f}s over {totals['count']}")
+    return "\n".join(lines)
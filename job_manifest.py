@@ -0,0 +1,71 @@
+import json
+import os
+
+
+class JobManifest:
+    """
+    Checkpoint of a conversion in progress, kept next to the partial audio file.
+
+    The first line records the synthesis settings; every following line records one finished
+    chunk (hash, status, where its audio sits in the partial file and how long it plays).
+    Lines are only appended, so a crash loses at most the chunk being written.
+    """
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.file = None
+
+    def load(self, audio_size):
+        """
+        Returns the finished chunks of a previous run with the same settings, in order,
+        keeping only those whose audio is fully present in a partial file of `audio_size` bytes.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+        try:
+            if not lines or json.loads(lines[0]) != self.settings:
+                return []
+        except ValueError:
+            return []
+
+        chunks = []
+        offset = None  # the first chunk may follow a container header
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # torn write from a crash
+            if entry.get('status') != 'done' or offset is not None and entry['offset'] != offset:
+                break
+            if entry['offset'] + entry['length'] > audio_size:
+                break
+            chunks.append(entry)
+            offset = entry['offset'] + entry['length']
+        return chunks
+
+    def start(self, kept_chunks):
+        # Rewrite with only the chunks being reused, then keep appending
+        self.file = open(self.path, 'w')
+        self.file.write(json.dumps(self.settings) + '\n')
+        for entry in kept_chunks:
+            self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def record(self, chunk_hash, offset, length, duration):
+        entry = {"hash": chunk_hash, "status": "done", "offset": offset, "length": length, "duration": duration}
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
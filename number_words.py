@@ -0,0 +1,107 @@
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+# Distinct numeric tokens remembered; documents repeat the same figures many times
+CACHE_SIZE = 4096
+
+# Thousands and decimal separators per num2words language
+SEPARATORS = {
+    'pt_BR': ('.', ','),
+    'en': (',', '.'),
+}
+
+CURRENCIES = {
+    'pt_BR': {'R$': ('real', 'reais'), 'US$': ('dólar', 'dólares'), '$': ('dólar', 'dólares'),
+              '€': ('euro', 'euros'), '£': ('libra', 'libras')},
+    'en': {'R$': ('real', 'reais'), 'US$': ('dollar', 'dollars'), '$': ('dollar', 'dollars'),
+           '€': ('euro', 'euros'), '£': ('pound', 'pounds')},
+}
+
+CENTS = {
+    'pt_BR': ('centavo', 'centavos'),
+    'en': ('cent', 'cents'),
+}
+
+AND_WORD = {
+    'pt_BR': 'e',
+    'en': 'and',
+}
+
+PERCENT_WORDS = {
+    'pt_BR': 'por cento',
+    'en': 'percent',
+}
+
+
+def _plural(amount, names):
+    return names[0] if amount == 1 else names[1]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def verbalize(lang, currency, integer, decimal, percent):
+    """
+    Words for one numeric token; `integer` has its thousands separators already removed.
+    """
+    # Imported here so loading the app does not pay for num2words' language tables
+    from num2words import num2words
+
+    if currency:
+        amount = int(integer)
+        words = f"{num2words(amount, lang=lang)} {_plural(amount, CURRENCIES[lang][currency])}"
+        cents = int((decimal or '0')[:2].ljust(2, '0'))
+        if cents:
+            words += f" {AND_WORD[lang]} {num2words(cents, lang=lang)} {_plural(cents, CENTS[lang])}"
+        return words
+
+    if decimal:
+        words = num2words(Decimal(f"{integer}.{decimal}"), lang=lang)
+    else:
+        words = num2words(int(integer), lang=lang)
+    if percent:
+        words += f" {PERCENT_WORDS[lang]}"
+    return words
+
+
+def cache_info():
+    info = verbalize.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups > 0 else 0,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+class NumberVerbalizer:
+    """
+    Replaces integers, decimals, percentages and currency amounts with words, using the
+    separators and currency names of the language.
+    """
+    def __init__(self, lang):
+        self.lang = lang
+        thousands, decimal = (re.escape(sep) for sep in SEPARATORS[lang])
+        self.thousands = SEPARATORS[lang][0]
+        symbols = '|'.join(re.escape(symbol) for symbol in sorted(CURRENCIES[lang], key=len, reverse=True))
+        self.pattern = re.compile(
+            rf'(?:(?P<currency>{symbols})\s?)?'
+            rf'\b(?P<integer>\d{{1,3}}(?:{thousands}\d{{3}})+|\d+)(?:{decimal}(?P<decimal>\d+))?\b'
+            rf'(?:\s?(?P<percent>%))?'
+        )
+
+    def _replace(self, match):
+        integer = match.group('integer').replace(self.thousands, '')
+        try:
+            return verbalize(self.lang, match.group('currency'), integer, match.group('decimal'),
+                             bool(match.group('percent')))
+        except (OverflowError, NotImplementedError):
+            # Beyond what num2words can say (10^18 and up in pt_BR): the digits are read as written
+            number = match.string[match.start('integer'):match.end()]
+            if match.group('currency'):
+                number += f" {CURRENCIES[self.lang][match.group('currency')][1]}"
+            return number
+
+    def sub(self, text):
+        return self.pattern.sub(self._replace, text)
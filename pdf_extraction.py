@@ -0,0 +1,170 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Pages handed to a worker at a time; small enough to keep workers balanced,
+# large enough that each task amortizes opening the PDF
+PAGES_PER_TASK = 8
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_range(total_pages, start_page=None, end_page=None):
+    # Adjust page range if not specified or out of bounds
+    start_page = max(1, min(start_page or 1, total_pages))
+    end_page = min(end_page or total_pages, total_pages)
+    return range(start_page - 1, end_page)
+
+
+def _pdf_reader(file):
+    # PyPDF2 is imported on first use rather than when the app starts
+    import PyPDF2
+    return PyPDF2.PdfReader(file)
+
+
+def count_pages(pdf_path, start_page=None, end_page=None):
+    with open(pdf_path, 'rb') as file:
+        return len(page_range(len(_pdf_reader(file).pages), start_page, end_page))
+
+
+def extract_page_batch(pdf_path, page_nums):
+    # Runs inside a worker process, which opens its own reader
+    with open(pdf_path, 'rb') as file:
+        reader = _pdf_reader(file)
+        return [reader.pages[page_num].extract_text() for page_num in page_nums]
+
+
+class PageTextCache:
+    """
+    Extracted page text stored per (file hash, page number), so changing the page range
+    does not re-parse pages that were already extracted. Documents are evicted whole,
+    least-recently-used, once the directory grows past `max_bytes`.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._documents = None  # file digest -> bytes, oldest first; loaded on first use
+        self._total_bytes = 0
+
+    def _path(self, file_digest, page_num):
+        return os.path.join(self.directory, file_digest, f"{page_num}.txt")
+
+    def _load_index(self):
+        if self._documents is not None:
+            return
+        found = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if not entry.is_dir():
+                    continue
+                try:
+                    size = sum(page.stat().st_size for page in os.scandir(entry.path))
+                    # The directory's mtime records recency so LRU order survives restarts
+                    found.append((entry.stat().st_mtime, entry.name, size))
+                except FileNotFoundError:
+                    continue
+        found.sort()
+        self._documents = OrderedDict((name, size) for _, name, size in found)
+        self._total_bytes = sum(self._documents.values())
+
+    def _touch(self, file_digest):
+        self._documents.move_to_end(file_digest)
+        try:
+            os.utime(os.path.join(self.directory, file_digest))
+        except FileNotFoundError:
+            pass
+
+    def has(self, file_digest, page_num):
+        return os.path.exists(self._path(file_digest, page_num))
+
+    def get(self, file_digest, page_num):
+        try:
+            with open(self._path(file_digest, page_num), 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            self._load_index()
+            if file_digest in self._documents:
+                self._touch(file_digest)
+        return text
+
+    def put(self, file_digest, page_num, text):
+        path = self._path(file_digest, page_num)
+        data = text.encode('utf-8')
+        with self.lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                previous_size = os.path.getsize(path)
+            except FileNotFoundError:
+                previous_size = 0
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._documents[file_digest] = self._documents.get(file_digest, 0) + len(data) - previous_size
+            self._total_bytes += len(data) - previous_size
+            self._touch(file_digest)
+            self._evict()
+
+    def _evict(self):
+        # The document being written stays, even if it alone is over the limit
+        while self._total_bytes > self.max_bytes and len(self._documents) > 1:
+            file_digest, size = self._documents.popitem(last=False)
+            shutil.rmtree(os.path.join(self.directory, file_digest), ignore_errors=True)
+            self._total_bytes -= size
+
+
+def _iter_extracted(pdf_path, page_nums, workers):
+    if workers > 1 and len(page_nums) > PAGES_PER_TASK:
+        batches = [page_nums[i:i + PAGES_PER_TASK] for i in range(0, len(page_nums), PAGES_PER_TASK)]
+        # spawn keeps workers independent of the GUI's threads and Tk state
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=context) as executor:
+            for texts in executor.map(extract_page_batch, repeat(pdf_path), batches):
+                yield from texts
+    else:
+        with open(pdf_path, 'rb') as file:
+            reader = _pdf_reader(file)
+            for page_num in page_nums:
+                yield reader.pages[page_num].extract_text()
+
+
+def iter_pages(pdf_path, start_page=None, end_page=None, workers=1, cache=None):
+    """
+    Yields the text of each page in the range, in order. Pages found in the cache are read
+    from it; the rest are extracted, across `workers` processes when there are enough of them.
+    """
+    with open(pdf_path, 'rb') as file:
+        pages = page_range(len(_pdf_reader(file).pages), start_page, end_page)
+
+    file_digest = file_hash(pdf_path) if cache is not None else None
+    missing = [page_num for page_num in pages if cache is None or not cache.has(file_digest, page_num)]
+    extracted = _iter_extracted(pdf_path, missing, workers)
+    missing = set(missing)
+
+    for page_num in pages:
+        if page_num in missing:
+            text = next(extracted)
+            if cache is not None:
+                cache.put(file_digest, page_num, text)
+        else:
+            text = cache.get(file_digest, page_num)
+            if text is None:
+                # Removed from the cache since it was checked
+                text = extract_page_batch(pdf_path, [page_num])[0]
+        yield text
@@ -0,0 +1,115 @@
+import os
+import time
+
+from audio_assembly import OUTPUT_FORMATS
+from audio_cache import chunk_key
+from chunker import POLLY_MAX_BILLED_CHARACTERS, iter_chunks
+from config import (
+    ALIGN_CHUNKS_TO_PAGES, INCREMENTAL_CONVERSION, MAX_TEXT_LENGTH, PDF_EXTRACT_WORKERS, POLLY_MAX_IN_FLIGHT,
+    POLLY_MAX_TPS, POLLY_PRICE_NEURAL, POLLY_PRICE_STANDARD, STRIP_BOILERPLATE
+)
+from converter import AUDIO_CACHE, STANDARD_ONLY_VOICES, iter_processed_pages, load_previous_segments, seed_engine_support
+from instrumentation import JobMetrics
+
+PRICES_PER_MILLION = {"standard": POLLY_PRICE_STANDARD, "neural": POLLY_PRICE_NEURAL}
+# Polly latency assumed until the usage ledger has some history (about 1.5s for a full chunk)
+DEFAULT_SECONDS_PER_CHARACTER = 0.0005
+# Recent requests the latency estimate is based on
+LATENCY_HISTORY = 1000
+
+
+def plan_conversion(pdf_path, output_file, voice_id, language_code, start_page=None, end_page=None,
+                    usage=None, cache=AUDIO_CACHE, incremental=INCREMENTAL_CONVERSION,
+                    align_pages=ALIGN_CHUNKS_TO_PAGES, strip_boilerplate=STRIP_BOILERPLATE,
+                    extract_workers=PDF_EXTRACT_WORKERS, max_in_flight=POLLY_MAX_IN_FLIGHT, max_tps=POLLY_MAX_TPS):
+    """
+    Dry run of convert_pdf: extracts, preprocesses and chunks the pages exactly as a conversion
+    would, without calling Polly, and returns what the conversion would take as a dict:
+
+    - "pages", "chunks" and "characters" in the range
+    - "reused_chunks" (unchanged since the last conversion to output_file) and "cached_chunks"
+      (in the audio cache), which cost nothing
+    - "requests" and "billed_characters" ({engine: characters}) left for Polly
+    - "cost" in USD, from the configured prices
+    - "seconds", the estimated synthesis time, from the Polly latency recorded in `usage` (a
+      PollyUsageTracker); "latency_source" is "history", or "default" without one
+
+    Extracted pages go to the page cache, so the conversion that follows does not extract them again.
+    """
+    started_at = time.monotonic()
+    metrics = JobMetrics()
+    seed_engine_support(voice_id)
+    engine = "standard" if voice_id in STANDARD_ONLY_VOICES else "neural"
+    audio_format, sample_rate = OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), OUTPUT_FORMATS[".mp3"])
+    previous_segments = load_previous_segments(output_file) if incremental else {}
+
+    pages = 0
+
+    def page_extracted():
+        nonlocal pages
+        pages += 1
+
+    texts = iter_processed_pages(pdf_path, language_code, start_page, end_page, extract_workers,
+                                 strip_boilerplate, metrics, page_extracted)
+    chunks = characters = reused = cached = requests = billed = 0
+    for chunk in iter_chunks(texts, MAX_TEXT_LENGTH, align=align_pages):
+        chunks += 1
+        characters += len(chunk)
+        # Keyed with the requested engine, like synthesize_chunks
+        key = chunk_key(chunk, voice_id, "neural", language_code, sample_rate, audio_format)
+        if key in previous_segments:
+            reused += 1
+        elif cache is not None and key in cache:
+            cached += 1
+        else:
+            requests += 1
+            billed += len(chunk)
+
+    seconds_per_character, latency_source = DEFAULT_SECONDS_PER_CHARACTER, "default"
+    if usage is not None:
+        history = usage.get_latency_history(LATENCY_HISTORY, POLLY_MAX_BILLED_CHARACTERS).get(engine)
+        if history and history["characters"]:
+            seconds_per_character, latency_source = history["latency"] / history["characters"], "history"
+    # Requests overlap up to max_in_flight, but never go faster than the rate limit
+    seconds = max(billed * seconds_per_character / max(1, max_in_flight), requests / max_tps if max_tps else 0.0)
+
+    return {
+        "pages": pages,
+        "chunks": chunks,
+        "characters": characters,
+        "boilerplate_characters_removed": metrics.counters.get("boilerplate_characters_removed", 0),
+        "reused_chunks": reused,
+        "cached_chunks": cached,
+        "requests": requests,
+        "engine": engine,
+        "billed_characters": {engine: billed},
+        "cost": billed / 1_000_000 * PRICES_PER_MILLION[engine],
+        "seconds": seconds,
+        "latency_source": latency_source,
+        "planning_seconds": time.monotonic() - started_at,
+    }
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}min"
+    return f"{minutes}min {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def format_plan(plan):
+    # Human-readable summary, for the confirmation dialog and the CLI
+    lines = [f"Pages: {plan['pages']}",
+             f"Chunks: {plan['chunks']} ({plan['characters']} characters)"]
+    if plan["reused_chunks"] or plan["cached_chunks"]:
+        lines.append(f"Already synthesized: {plan['reused_chunks'] + plan['cached_chunks']} chunks")
+    lines.append(f"Polly requests: {plan['requests']}")
+    for engine, characters in plan["billed_characters"].items():
+        lines.append(f"Billed characters ({engine}): {characters}")
+    lines.append(f"Estimated cost: ${plan['cost']:.2f}")
+    estimate = format_duration(plan["seconds"])
+    if plan["latency_source"] == "default":
+        estimate += " (no latency history yet)"
+    lines.append(f"Estimated time: {estimate}")
+    return "\n".join(lines)
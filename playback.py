@@ -0,0 +1,115 @@
+import io
+import tempfile
+import time
+from collections import deque
+
+from audio_assembly import wav_header
+
+
+class StreamingPlayer:
+    """
+    Plays a conversion while it is still running: segments are added in order as they are
+    synthesized (add), and pump(), called periodically from the UI thread, keeps one segment
+    playing and the next one queued on a pygame mixer channel.
+
+    `mixer` is an initialized pygame.mixer; PCM segments are wrapped in a WAV header at
+    `sample_rate` so the mixer can decode them.
+
+    Synthesis runs far ahead of playback, so segments wait encoded, in a temporary spool file,
+    and are only decoded into Sounds when their turn comes: at most the one playing, the one
+    queued on the channel and the next one are decoded at any time.
+    """
+    def __init__(self, mixer, audio_format, sample_rate):
+        self.mixer = mixer
+        self.audio_format = audio_format
+        self.sample_rate = int(sample_rate)
+        self.spool = tempfile.TemporaryFile()
+        self.pending = deque()  # (offset, length, duration) in the spool, not decoded yet
+        self.ready = None       # (sound, duration) decoded, next to hand to the channel
+        self.channel = None
+        self.playing = None     # (duration, started_at) of the segment being heard
+        self.queued = None      # duration of the segment waiting on the channel
+        self.finished = False
+        self.stopped = False
+        self.underruns = 0
+
+    def add(self, audio, duration):
+        if self.stopped:
+            return
+        if not self.pending:
+            # Everything spooled so far has been decoded: start the spool over
+            self.spool.seek(0)
+            self.spool.truncate()
+        self.spool.seek(0, io.SEEK_END)
+        self.pending.append((self.spool.tell(), len(audio), duration))
+        self.spool.write(audio)
+
+    def _next(self):
+        # The next segment to play, decoded on first use; None if there is none yet
+        if self.ready is None and self.pending:
+            offset, length, duration = self.pending.popleft()
+            self.spool.seek(offset)
+            audio = self.spool.read(length)
+            if self.audio_format == "pcm":
+                audio = wav_header(len(audio), self.sample_rate) + audio
+            self.ready = (self.mixer.Sound(file=io.BytesIO(audio)), duration)
+        return self.ready
+
+    def finish(self):
+        # No more segments will be added
+        self.finished = True
+
+    def pump(self):
+        now = time.monotonic()
+        if self.queued is not None and self.channel.get_queue() is None:
+            # The queued segment has started playing
+            self.playing = (self.queued, now)
+            self.queued = None
+
+        if self.channel is None or not self.channel.get_busy():
+            if self.playing is not None and not self.pending and self.ready is None and not self.finished:
+                self.underruns += 1  # ran dry before the next segment arrived
+            self.playing = None
+            if self._next() is not None:
+                sound, duration = self.ready
+                channel = sound.play()
+                if channel is not None:  # None while every mixer channel is busy
+                    self.ready = None
+                    self.channel = channel
+                    self.playing = (duration, now)
+
+        if self.channel is not None and self.queued is None and self.playing is not None and self._next() is not None:
+            sound, duration = self.ready
+            self.ready = None
+            self.channel.queue(sound)
+            self.queued = duration
+
+    def buffered_seconds(self):
+        """
+        Seconds of audio already synthesized ahead of what is being heard.
+        """
+        seconds = sum(duration for _, _, duration in self.pending) + (self.queued or 0.0)
+        if self.ready is not None:
+            seconds += self.ready[1]
+        if self.playing is not None:
+            duration, started_at = self.playing
+            seconds += max(0.0, duration - (time.monotonic() - started_at))
+        return seconds
+
+    def state(self):
+        if self.playing is not None:
+            return "playing"
+        if self.finished and not self.pending and self.ready is None:
+            return "done"
+        return "buffering"
+
+    def stop(self):
+        self.pending.clear()
+        self.ready = None
+        self.spool.close()
+        self.queued = None
+        self.playing = None
+        self.finished = True
+        self.stopped = True
+        if self.channel is not None:
+            self.channel.stop()
@@ -0,0 +1,145 @@
+import os
+import time
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+from audio_assembly import OUTPUT_FORMATS, AudioAssembler, SegmentBuffer
+from instrumentation import NO_METRICS
+from synthesis import THROTTLED, TRANSIENT, UNSUPPORTED_ENGINE, ConversionCancelled, SynthesisEngine, classify_error
+
+# Seconds between status checks of a synthesis task, growing up to the maximum
+POLL_INTERVAL = 2.0
+POLL_INTERVAL_MAX = 30.0
+# Give up on a task that has not finished after this long
+TASK_TIMEOUT = 3 * 60 * 60
+
+# Polly allows far fewer running tasks than synchronous requests
+DEFAULT_MAX_TASKS = 2
+
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class SynthesisTaskFailed(Exception):
+    pass
+
+
+def s3_key_from_uri(uri, bucket):
+    # Polly returns either path-style (s3.region.amazonaws.com/bucket/key) or virtual-hosted URIs
+    path = urlparse(uri).path.lstrip('/')
+    if path.startswith(bucket + '/'):
+        path = path[len(bucket) + 1:]
+    return path
+
+
+def wait_for_task(polly_client, task_id, sleep=time.sleep):
+    interval = POLL_INTERVAL
+    deadline = time.monotonic() + TASK_TIMEOUT
+    while True:
+        try:
+            task = polly_client.get_speech_synthesis_task(TaskId=task_id)['SynthesisTask']
+        except Exception as e:
+            # Retry here, connection errors included: letting the engine retry run_task would
+            # start a second task, billed again
+            if classify_error(e) not in (THROTTLED, TRANSIENT):
+                raise
+            task = {'TaskStatus': 'unknown'}
+        if task['TaskStatus'] == 'completed':
+            return task
+        if task['TaskStatus'] == 'failed':
+            raise SynthesisTaskFailed(f"Synthesis task {task_id} failed: {task.get('TaskStatusReason', '')}")
+        if time.monotonic() > deadline:
+            raise SynthesisTaskFailed(f"Synthesis task {task_id} did not finish in {TASK_TIMEOUT} seconds")
+        sleep(interval)
+        interval = min(POLL_INTERVAL_MAX, interval * 1.5)
+
+
+def synthesize_with_tasks(chunks, output_file, voice_id, language_code, polly_client, s3_client,
+                          bucket, prefix="", max_tasks=DEFAULT_MAX_TASKS, standard_only_voices=None,
+                          progress=None, cancel=None, delete_results=True, usage=None, metrics=None):
+    """
+    Synthesizes large text batches with StartSpeechSynthesisTask instead of one request per
+    sentence group. Up to `max_tasks` tasks run at once; their results are streamed from the
+    S3 bucket into output_file in order, joined into one stream (MP3, or WAV for a .wav
+    output_file) with a segment index next to it, then deleted from the bucket.
+    `chunks` should come from iter_chunks(..., task=True). Setting the `cancel` event stops
+    submitting new tasks. `usage`, if given, is a PollyUsageTracker that gets one entry per task,
+    and `metrics` a JobMetrics that records each task's latency.
+    Returns the number of characters sent for synthesis.
+    """
+    standard_only_voices = standard_only_voices if standard_only_voices is not None else set()
+    metrics = metrics if metrics is not None else NO_METRICS
+    audio_format, sample_rate = OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), OUTPUT_FORMATS[".mp3"])
+    characters = 0
+
+    def start_task(text, engine):
+        return polly_client.start_speech_synthesis_task(
+            Text=text,
+            TextType="text",
+            OutputFormat=audio_format,
+            VoiceId=voice_id,
+            LanguageCode=language_code,
+            Engine=engine,
+            SampleRate=sample_rate,
+            OutputS3BucketName=bucket,
+            OutputS3KeyPrefix=prefix
+        )['SynthesisTask']
+
+    def run_task(text):
+        started_at = time.monotonic()
+        engine = "neural"
+        if voice_id not in standard_only_voices:
+            try:
+                task = start_task(text, "neural")
+            except ClientError as e:
+                if classify_error(e) != UNSUPPORTED_ENGINE:
+                    raise
+                standard_only_voices.add(voice_id)
+                engine = "standard"
+                task = start_task(text, "standard")
+        else:
+            engine = "standard"
+            task = start_task(text, "standard")
+        task = wait_for_task(polly_client, task['TaskId'])
+        latency = time.monotonic() - started_at
+        metrics.observe("chunk_latency", latency)
+        metrics.count("requests")
+        if usage is not None:
+            usage.add_entry(len(text), voice_id, engine, latency=latency, job=output_file)
+        return task
+
+    def counted(chunks):
+        nonlocal characters
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                raise ConversionCancelled("Conversion cancelled")
+            characters += len(chunk)
+            metrics.count("characters", len(chunk))
+            yield chunk
+
+    partial_file = output_file + ".part"
+    engine = SynthesisEngine(max_in_flight=max_tasks, max_tps=1)
+    try:
+        with open(partial_file, 'wb') as file:
+            assembler = AudioAssembler(file, audio_format, sample_rate)
+            tasks = metrics.timed(engine.map(run_task, counted(metrics.timed(chunks, "chunking"))), "waiting")
+            for index, task in enumerate(tasks, start=1):
+                key = s3_key_from_uri(task['OutputUri'], bucket)
+                body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+                with metrics.span("writing"):
+                    # Results can be hundreds of megabytes: SegmentBuffer spills them to disk
+                    audio = SegmentBuffer.from_stream(body, DOWNLOAD_BLOCK_SIZE)
+                    assembler.add(audio)
+                    audio.close()
+                if delete_results:
+                    s3_client.delete_object(Bucket=bucket, Key=key)
+                if progress:
+                    progress(chunks_synthesized=index, bytes_written=assembler.offset)
+            assembler.finish()
+        os.replace(partial_file, output_file)
+        assembler.write_index(output_file + ".index.json")
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+
+    return characters
@@ -0,0 +1,56 @@
+import re
+from number_words import NumberVerbalizer
+
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s.,?!]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class Preprocessor:
+    """
+    Text cleanup for one language, with every rule compiled once.
+
+    Runs a fixed number of passes over the text however many plain keywords are configured:
+    numbers (including decimals, percentages and currency) to words, keyword normalization
+    (one alternation), special characters, whitespace.
+    Keywords written as regular expressions still get a precompiled pass each.
+    The pauses added after punctuation and the slow-rate phrase substitutions of the original
+    preprocessors are left out: the first is undone by the final whitespace collapse and the
+    second replaced each phrase with itself, so neither changed the output.
+    """
+    def __init__(self, number_lang, keywords):
+        self.numbers = NumberVerbalizer(number_lang)
+        keywords = [keyword for keyword in keywords if keyword]
+        # Keywords are inserted in the pattern as regexes, as before; only plain words and
+        # phrases can share one alternation, since the match is mapped back by its text
+        plain = [keyword for keyword in keywords if re.escape(keyword) == keyword.replace(' ', r'\ ')]
+        self.regex_keywords = [
+            (re.compile(rf'\b{keyword}\b', flags=re.IGNORECASE), keyword)
+            for keyword in keywords if keyword not in plain
+        ]
+        # Later keywords win when they differ only in case, as with the old one-pass-per-keyword loop
+        self.keyword_by_text = {keyword.lower(): keyword for keyword in plain}
+        self.keyword_pattern = None
+        if plain:
+            alternatives = sorted(set(plain), key=len, reverse=True)
+            self.keyword_pattern = re.compile(
+                r'\b(?:' + '|'.join(re.escape(keyword) for keyword in alternatives) + r')\b',
+                flags=re.IGNORECASE
+            )
+
+    def _keyword(self, match):
+        text = match.group()
+        keyword = self.keyword_by_text.get(text.lower())
+        if keyword is None:
+            # Case folding the regex engine accepts but str.lower() does not reproduce
+            keyword = next(k for k in reversed(list(self.keyword_by_text.values()))
+                           if re.fullmatch(re.escape(k), text, flags=re.IGNORECASE))
+        return keyword
+
+    def __call__(self, text):
+        text = self.numbers.sub(text)
+        if self.keyword_pattern is not None:
+            text = self.keyword_pattern.sub(self._keyword, text)
+        for pattern, keyword in self.regex_keywords:
+            text = pattern.sub(keyword, text)
+        text = SPECIAL_CHARS_PATTERN.sub('', text)
+        return WHITESPACE_PATTERN.sub(' ', text).strip()
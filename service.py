@@ -0,0 +1,387 @@
+"""
+Local conversion service: accepts conversion jobs over HTTP (or a Unix socket) and runs them
+on a fixed pool of workers, highest priority first, all sharing one Polly request budget so
+several users converting at once stay under the account's quota together.
+
+    python service.py                       # http://127.0.0.1:8765
+    python service.py --socket /tmp/tts-pdf.sock --workers 4
+
+API (JSON):
+    POST   /jobs?voice=..&language=..   with a PDF as the body (Content-Type: application/pdf),
+                                 and optionally start_page, end_page, priority, format -> 202 job
+    POST   /jobs                 {"pdf", "voice", "language", "start_page"?, "end_page"?, "priority"?,
+                                  "format"?}, for a PDF in one of SERVICE_INPUT_DIRS
+    GET    /jobs                 all jobs, most recent first
+    GET    /jobs/<id>            job status, progress and, when done, its timing report
+    GET    /jobs/<id>/audio      the converted audio, once the job is done
+    DELETE /jobs/<id>            cancel (queued jobs never start; running ones stop between chunks)
+
+The service only writes inside its data directory: each job's audio goes to
+outputs/<id>.<format>, to be downloaded, and is deleted with the job
+SERVICE_JOB_RETENTION_HOURS after it finishes. Uploaded PDFs are deleted when their job ends.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import shutil
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cli import resolve_language
+from config import (
+    POLLY_MAX_TPS, SERVICE_DATA_DIR, SERVICE_HOST, SERVICE_INPUT_DIRS, SERVICE_JOB_RETENTION_HOURS,
+    SERVICE_PORT, SERVICE_WORKERS
+)
+from converter import ConversionCancelled, convert_pdf
+from instrumentation import JobMetrics
+from synthesis import RateLimiter
+from tracker import PollyUsageTracker
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+CONTENT_TYPES = {".mp3": "audio/mpeg", ".wav": "audio/wav"}
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class Job:
+    def __init__(self, pdf, voice, language_code, start_page=None, end_page=None, priority=0, upload=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.pdf = pdf
+        self.upload = upload  # the PDF belongs to the service, and is deleted with the job
+        self.output = None
+        self.voice = voice
+        self.language_code = language_code
+        self.start_page = start_page
+        self.end_page = end_page
+        self.priority = priority
+        self.status = QUEUED
+        self.progress = {}
+        self.characters = None
+        self.report = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "pdf": self.pdf,
+            "voice": self.voice,
+            "language": self.language_code,
+            "start_page": self.start_page,
+            "end_page": self.end_page,
+            "priority": self.priority,
+            "progress": self.progress,
+            "characters": self.characters,
+            "report": self.report,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ConversionService:
+    """
+    Prioritized queue of conversions, run by `workers` threads that share one RateLimiter
+    (`max_tps` requests per second in total) and one usage ledger.
+    PDFs are read from uploads in `data_dir` or from `input_dirs`; finished jobs are dropped
+    after `retention` seconds.
+    """
+    def __init__(self, workers=SERVICE_WORKERS, max_tps=POLLY_MAX_TPS, data_dir=SERVICE_DATA_DIR, usage=None,
+                 input_dirs=SERVICE_INPUT_DIRS, retention=SERVICE_JOB_RETENTION_HOURS * 3600):
+        self.data_dir = data_dir
+        self.input_dirs = [os.path.realpath(path) for path in input_dirs]
+        self.retention = retention
+        self.rate_limiter = RateLimiter(max_tps)
+        self.usage = usage
+        self.jobs = {}
+        self.queue = []  # heap of (-priority, submission order, job)
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, pdf, voice, language, start_page=None, end_page=None, priority=0, format="mp3", upload=False):
+        """
+        Queues a conversion. `pdf` is a path in one of the input directories, or one returned
+        by upload_path() with `upload` set. Raises ValueError for a job that cannot run.
+        """
+        if not upload and not any(os.path.realpath(pdf).startswith(directory + os.sep) for directory in self.input_dirs):
+            raise ValueError(f"Not in an input directory: {pdf}")
+        if not os.path.isfile(pdf):
+            raise ValueError(f"PDF not found: {pdf}")
+        if not voice:
+            raise ValueError("No voice given")
+        if format not in ("mp3", "wav"):
+            raise ValueError(f"Unsupported format: {format}")
+        job = Job(pdf, voice, resolve_language(language), start_page, end_page, int(priority), upload)
+        # Named after the job, so no two jobs ever write to the same files
+        job.output = os.path.join(self.data_dir, "outputs", f"{job.id}.{format}")
+        os.makedirs(os.path.dirname(job.output), exist_ok=True)
+        with self.condition:
+            self._prune()
+            self.jobs[job.id] = job
+            heapq.heappush(self.queue, (-job.priority, next(self.order), job))
+            self.condition.notify()
+        return job
+
+    def upload_path(self):
+        directory = os.path.join(self.data_dir, "uploads")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{uuid.uuid4().hex[:12]}.pdf")
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        with self.condition:
+            self._prune()
+            return sorted(self.jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def _prune(self):
+        # Forgets jobs finished more than `retention` seconds ago, deleting their audio
+        cutoff = time.time() - self.retention
+        for job in [job for job in self.jobs.values() if job.finished_at is not None and job.finished_at < cutoff]:
+            del self.jobs[job.id]
+            for path in (job.output, job.output + ".index.json"):
+                remove_file(path)
+
+    def _finished(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        if job.upload:
+            remove_file(job.pdf)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        with self.condition:
+            if job.status == QUEUED:
+                # Left in the heap; the worker that pops it skips it
+                self._finished(job, CANCELLED)
+        job.cancel_event.set()
+        return job
+
+    def shutdown(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        for job in self.jobs.values():
+            job.cancel_event.set()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                _, _, job = heapq.heappop(self.queue)
+                if job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+            self._run(job)
+
+    def _run(self, job):
+        started_at = time.monotonic()
+
+        def progress(pages_extracted, pages_total, chunks_synthesized, bytes_written):
+            eta = None
+            if pages_total and pages_extracted:
+                eta = (time.monotonic() - started_at) / pages_extracted * (pages_total - pages_extracted)
+            job.progress = {
+                "pages_extracted": pages_extracted,
+                "pages_total": pages_total,
+                "chunks_synthesized": chunks_synthesized,
+                "bytes_written": bytes_written,
+                "eta": eta,
+            }
+
+        metrics = JobMetrics()
+        try:
+            job.characters = convert_pdf(job.pdf, job.output, job.voice, job.language_code,
+                                         job.start_page, job.end_page, progress=progress,
+                                         cancel=job.cancel_event, rate_limiter=self.rate_limiter,
+                                         usage=self.usage, metrics=metrics, resume=False)
+        except ConversionCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+        else:
+            metrics.finish()
+            job.report = metrics.report()
+            status = DONE
+        with self.condition:
+            self._finished(job, status)
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self._parts()
+        if parts == ["jobs"]:
+            self._send_json(200, [job.to_dict() for job in self.server.service.list()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job is not None:
+                self._send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "audio":
+            job = self._job(parts[1])
+            if job is not None:
+                self._send_audio(job)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self._parts() != ["jobs"]:
+            self._send_json(404, {"error": "Not found"})
+            return
+        service = self.server.service
+        length = int(self.headers.get("Content-Length", 0))
+        params = {}
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/pdf"):
+                # Uploaded PDF, with the job settings in the query string
+                params = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                params.update(pdf=service.upload_path(), upload=True)
+                with open(params["pdf"], "wb") as f:
+                    remaining = length
+                    while remaining:
+                        block = self.rfile.read(min(COPY_BLOCK_SIZE, remaining))
+                        if not block:
+                            break
+                        f.write(block)
+                        remaining -= len(block)
+            else:
+                params = dict(json.loads(self.rfile.read(length) or b"{}"), upload=False)
+            for key in ("start_page", "end_page", "priority"):
+                if params.get(key) not in (None, ""):
+                    params[key] = int(params[key])
+            job = service.submit(**{key: value for key, value in params.items() if value not in (None, "")})
+        except (TypeError, ValueError) as e:
+            if params.get("upload"):
+                remove_file(params["pdf"])
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self._parts()
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.server.service.cancel(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "No such job"})
+            else:
+                self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _parts(self):
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def _job(self, job_id):
+        job = self.server.service.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": "No such job"})
+        return job
+
+    def _send_audio(self, job):
+        if job.status != DONE:
+            self._send_json(409, {"error": f"Job is {job.status}"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES.get(os.path.splitext(job.output)[1], "application/octet-stream"))
+        self.send_header("Content-Length", str(os.path.getsize(job.output)))
+        self.end_headers()
+        with open(job.output, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, COPY_BLOCK_SIZE)
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local PDF to speech conversion service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Conversions run at the same time")
+    parser.add_argument("--max-tps", type=float, default=POLLY_MAX_TPS, help="Polly requests per second, for all jobs")
+    args = parser.parse_args(argv)
+
+    usage = PollyUsageTracker()
+    service = ConversionService(args.workers, args.max_tps, usage=usage)
+    server = make_server(service, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Conversion service listening on {where} with {args.workers} workers", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        usage.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
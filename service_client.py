@@ -0,0 +1,142 @@
+import http.client
+import json
+import os
+import queue
+import shutil
+import socket
+import threading
+import time
+from urllib.parse import quote, urlencode, urlparse
+
+POLL_INTERVAL = 0.5
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceError(Exception):
+    pass
+
+
+class ServiceClient:
+    """
+    Client of the local conversion service (service.py), at http://host:port or unix:///path.
+    """
+    def __init__(self, url, timeout=30):
+        self.url = urlparse(url)
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.url.scheme == "unix":
+            return UnixHTTPConnection(self.url.path, self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None, body=None, headers=None):
+        connection = self._connection()
+        try:
+            if payload is not None:
+                body, headers = json.dumps(payload).encode(), {"Content-Type": "application/json"}
+            connection.request(method, path, body, headers or {})
+            response = connection.getresponse()
+            data = json.loads(response.read() or b"null")
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise ServiceError(data.get("error") if isinstance(data, dict) else f"HTTP {response.status}")
+        return data
+
+    def submit(self, pdf, voice, language, start_page=None, end_page=None, priority=0, format="mp3"):
+        """
+        Uploads a PDF and queues its conversion; returns the job.
+        """
+        params = {"voice": voice, "language": language, "start_page": start_page, "end_page": end_page,
+                  "priority": priority, "format": format}
+        query = urlencode({key: value for key, value in params.items() if value is not None})
+        with open(pdf, "rb") as f:
+            headers = {"Content-Type": "application/pdf", "Content-Length": str(os.path.getsize(pdf))}
+            return self._request("POST", f"/jobs?{query}", body=f, headers=headers)
+
+    def download(self, job_id, output_file):
+        """
+        Saves the audio of a finished job to output_file.
+        """
+        connection = self._connection()
+        try:
+            connection.request("GET", f"/jobs/{quote(job_id)}/audio")
+            response = connection.getresponse()
+            if response.status >= 400:
+                data = json.loads(response.read() or b"null")
+                raise ServiceError(data.get("error") if isinstance(data, dict) else f"HTTP {response.status}")
+            # Written aside first, so a broken download does not replace an earlier output
+            partial_file = output_file + ".part"
+            with open(partial_file, "wb") as f:
+                shutil.copyfileobj(response, f, DOWNLOAD_BLOCK_SIZE)
+            os.replace(partial_file, output_file)
+        finally:
+            connection.close()
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{quote(job_id)}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{quote(job_id)}")
+
+    def list(self):
+        return self._request("GET", "/jobs")
+
+
+class RemoteConversionWorker(threading.Thread):
+    """
+    Stands in for ConversionWorker when conversions run in the local service: uploads the PDF,
+    polls the job's status and reports through `events` the same way (progress, done, cancelled,
+    error). Audio is not streamed; it is downloaded to `output_file` once the job is done.
+    """
+    def __init__(self, client, pdf_path, output_file, voice_id, language_code, start_page=None, end_page=None,
+                 priority=0):
+        super().__init__(daemon=True)
+        self.client = client
+        self.voice_id = voice_id
+        self.output_file = output_file
+        audio_format = "wav" if output_file.lower().endswith(".wav") else "mp3"
+        self.job = dict(pdf=pdf_path, voice=voice_id, language=language_code, start_page=start_page,
+                        end_page=end_page, priority=priority, format=audio_format)
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            job = self.client.submit(**self.job)
+            cancel_sent = False
+            while job["status"] in ("queued", "running"):
+                if self.cancel_event.is_set() and not cancel_sent:
+                    job = self.client.cancel(job["id"])
+                    cancel_sent = True
+                    continue
+                time.sleep(POLL_INTERVAL)
+                job = self.client.status(job["id"])
+                if job["progress"]:
+                    self.events.put(dict(job["progress"], type="progress"))
+            if job["status"] == "done":
+                self.client.download(job["id"], self.output_file)
+        except (OSError, http.client.HTTPException, ServiceError) as e:
+            self.events.put({"type": "error", "message": f"Conversion service: {e}"})
+            return
+
+        if job["status"] == "done":
+            self.events.put({"type": "done", "characters": job["characters"], "report": job["report"]})
+        elif job["status"] == "cancelled":
+            self.events.put({"type": "cancelled"})
+        else:
+            self.events.put({"type": "error", "message": job["error"]})
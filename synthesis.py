@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from botocore.exceptions import (
+    ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+)
+
+# Defaults stay well under the account-level Polly synthesize_speech quota
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_TPS = 8.0
+DEFAULT_MAX_RETRIES = 6
+
+# Backoff between retries, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+THROTTLING_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"}
+TRANSIENT_CODES = {"ServiceFailureException", "ServiceUnavailable", "InternalFailure", "InternalServerError"}
+
+# Error classes returned by classify_error
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+UNSUPPORTED_ENGINE = "unsupported_engine"
+FATAL = "fatal"
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def classify_error(error):
+    if isinstance(error, (EndpointConnectionError, ConnectionClosedError, ConnectTimeoutError, ReadTimeoutError)):
+        return TRANSIENT
+    if not isinstance(error, ClientError):
+        return FATAL
+    code = error.response.get("Error", {}).get("Code", "")
+    if code in THROTTLING_CODES:
+        return THROTTLED
+    if code == "EngineNotSupportedException" or 'UnsupportedEngine' in str(error):
+        return UNSUPPORTED_ENGINE
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+    if code in TRANSIENT_CODES or status >= 500:
+        return TRANSIENT
+    return FATAL
+
+
+def backoff_delay(attempt):
+    # Full jitter: spreads out retries from workers that were throttled together
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests start per second, shared by all workers.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Limits how many requests run at once, AIMD style: the limit halves when Polly throttles
+    and grows back by one for every `limit` successful requests, up to `max_limit`.
+    """
+    def __init__(self, max_limit):
+        self.max_limit = max(1, int(max_limit))
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        with self.condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def on_throttled(self):
+        with self.condition:
+            self.limit = max(1.0, self.limit / 2)
+
+
+class SynthesisEngine:
+    """
+    Runs a synthesis function over text chunks in parallel and yields the results in input order.
+
+    At most `max_in_flight` chunks are submitted ahead of the one being consumed, so memory stays
+    bounded even when the caller reads results slowly. Throttling and transient AWS errors are
+    retried with jittered exponential backoff, and throttling also lowers the concurrency.
+    """
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_tps=DEFAULT_MAX_TPS, rate_limiter=None,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        self.max_in_flight = max(1, int(max_in_flight))
+        # Pass a shared limiter when several engines run at once against the same quota
+        self.rate_limiter = rate_limiter or RateLimiter(max_tps)
+        self.concurrency = AdaptiveConcurrency(self.max_in_flight)
+        self.max_retries = max_retries
+
+    def _call(self, func, item):
+        attempt = 0
+        while True:
+            self.concurrency.acquire()
+            try:
+                self.rate_limiter.acquire()
+                result = func(item)
+            except Exception as error:
+                kind = classify_error(error)
+                if kind == THROTTLED:
+                    self.concurrency.on_throttled()
+                if kind not in (THROTTLED, TRANSIENT) or attempt >= self.max_retries:
+                    raise
+            else:
+                self.concurrency.on_success()
+                return result
+            finally:
+                self.concurrency.release()
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def map(self, func, items, local=None):
+        """
+        Yields func(item) for each item, in order. `local`, if given, is tried first for each
+        item; when it returns something other than None (e.g. audio found in a cache), that is
+        the result, without taking a concurrency slot or a rate limiter token.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        pending = deque()
+        try:
+            for item in items:
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+                result = local(item) if local is not None else None
+                if result is not None:
+                    future = Future()
+                    future.set_result(result)
+                    pending.append(future)
+                else:
+                    pending.append(executor.submit(self._call, func, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Drop queued chunks if the caller stopped early or a chunk failed
+            executor.shutdown(wait=True, cancel_futures=True)
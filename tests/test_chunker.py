@@ -0,0 +1,69 @@
+import random
+
+from chunker import (
+    POLLY_MAX_BILLED_CHARACTERS, POLLY_MAX_REQUEST_CHARACTERS, POLLY_TASK_MAX_BILLED_CHARACTERS, iter_chunks,
+    request_limit, split_text
+)
+
+WORDS = ["a", "palavra", "sentence", "vírgula,", "clause;", "colon:", "end.", "question?", "wow!", "x" * 40]
+
+
+def random_texts(rng, max_length):
+    texts = []
+    for _ in range(rng.randint(0, 6)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(0, 400))]
+        if rng.random() < 0.1:
+            # A "word" longer than a request, e.g. a URL
+            words.insert(rng.randint(0, len(words)), "u" * rng.randint(max_length, 3 * max_length))
+        texts.append(rng.choice([" ", "  ", "\n"]).join(words))
+    return texts
+
+
+def check_chunks(texts, chunks, max_length):
+    assert all(chunks), "empty chunk"
+    assert all(len(chunk) <= max_length for chunk in chunks)
+    # Only whitespace may change: the chunks, in order, hold all of the text
+    assert "".join("".join(chunk.split()) for chunk in chunks) == "".join("".join(text.split()) for text in texts)
+    if all(len(word) <= max_length for text in texts for word in text.split()):
+        # And no word was cut or glued to another
+        assert " ".join(chunks).split() == " ".join(texts).split()
+
+
+def test_request_limits():
+    assert request_limit(10 ** 6) == min(POLLY_MAX_BILLED_CHARACTERS, POLLY_MAX_REQUEST_CHARACTERS)
+    assert request_limit(10 ** 6, task=True) == POLLY_TASK_MAX_BILLED_CHARACTERS
+    assert request_limit(500) == 500
+
+
+def test_chunk_invariants():
+    rng = random.Random(11)
+    for _ in range(300):
+        max_length = rng.choice([20, 100, 700, 10 ** 6])
+        texts = random_texts(rng, min(max_length, POLLY_MAX_BILLED_CHARACTERS))
+        for align in (False, True):
+            chunks = list(iter_chunks(texts, max_length, align=align))
+            check_chunks(texts, chunks, request_limit(max_length))
+
+
+def test_task_chunks_stay_under_task_limits():
+    text = " ".join(["sentence."] * 30000)
+    chunks = list(iter_chunks([text], 10 ** 6, task=True))
+    check_chunks([text], chunks, POLLY_TASK_MAX_BILLED_CHARACTERS)
+    assert len(chunks) == 3
+
+
+def test_aligned_chunks_stay_put_when_one_text_changes():
+    pages = [" ".join(f"Page {page} sentence {n}." for n in range(20)) for page in range(6)]
+    revised = list(pages)
+    revised[2] = revised[2].replace("sentence 5.", "sentence five, revised.")
+    before = list(iter_chunks(pages, 100, align=True))
+    after = list(iter_chunks(revised, 100, align=True))
+    # Only the chunks of the revised page (and the sentence carried over to the next) change
+    changed = set(after) - set(before)
+    assert changed and all("Page 2" in chunk or "Page 3" in chunk for chunk in changed)
+    assert set(before) - set(after) <= {chunk for chunk in before if "Page 2" in chunk or "Page 3" in chunk}
+
+
+def test_split_text_of_empty_text():
+    assert split_text("") == []
+    assert split_text("   \n ") == []
@@ -1,48 +1,170 @@
 import datetime
 import json
-from collections import deque
+import os
+import sqlite3
+import threading
+
+from config import USAGE_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    job TEXT,
+    voice_id TEXT NOT NULL,
+    engine TEXT,
+    characters INTEGER NOT NULL,
+    latency REAL,
+    cache_hit INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS usage_job ON usage (job);
+
+-- Running totals per engine, kept up to date on every insert so summaries never scan the log
+CREATE TABLE IF NOT EXISTS usage_totals (
+    engine TEXT PRIMARY KEY,
+    characters INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    cache_hits INTEGER NOT NULL,
+    latency REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS usage_totals_insert AFTER INSERT ON usage BEGIN
+    INSERT INTO usage_totals (engine, characters, requests, cache_hits, latency)
+    VALUES (COALESCE(NEW.engine, ''),
+            CASE WHEN NEW.cache_hit THEN 0 ELSE NEW.characters END,
+            CASE WHEN NEW.cache_hit THEN 0 ELSE 1 END,
+            NEW.cache_hit,
+            CASE WHEN NEW.cache_hit THEN 0 ELSE COALESCE(NEW.latency, 0) END)
+    ON CONFLICT (engine) DO UPDATE SET
+        characters = characters + excluded.characters,
+        requests = requests + excluded.requests,
+        cache_hits = cache_hits + excluded.cache_hits,
+        latency = latency + excluded.latency;
+END;
+"""
 
 class PollyUsageTracker:
-    def __init__(self, max_log_entries=100):
-        self.log = deque(maxlen=max_log_entries)
-        self.total_characters = 0
-        self.total_requests = 0
+    """
+    Append-only ledger of Polly usage in SQLite (WAL mode), one entry per synthesized chunk,
+    written as it happens so nothing is lost if the app stops. Safe to share between the
+    synthesis threads of a process, and between processes using the same file.
+    Cache hits are logged but not counted as billed characters or requests.
+    """
+    def __init__(self, path=USAGE_DB_PATH, max_log_entries=100):
+        self.path = path
+        self.max_log_entries = max_log_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
 
-    def add_entry(self, text_length, voice_id):
+    def add_entry(self, text_length, voice_id, engine=None, latency=None, cache_hit=False, job=None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = {
-            "timestamp": timestamp,
-            "characters": text_length,
-            "voice_id": voice_id,
-        }
-        self.log.appendleft(entry)
-        self.total_characters += text_length
-        self.total_requests += 1
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO usage (timestamp, job, voice_id, engine, characters, latency, cache_hit) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, job, voice_id, engine, text_length, latency, int(cache_hit))
+            )
 
     def get_log(self):
-        return list(self.log)
+        # Most recent entries first
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT timestamp, job, voice_id, engine, characters, latency, cache_hit "
+                "FROM usage ORDER BY id DESC LIMIT ?", (self.max_log_entries,)
+            ).fetchall()
+        return [dict(row, cache_hit=bool(row["cache_hit"])) for row in rows]
+
+    def get_engine_totals(self):
+        """
+        Returns {engine: {"characters", "requests", "cache_hits", "latency"}}, with latency the
+        total seconds spent waiting on Polly for those requests.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM usage_totals").fetchall()
+        return {row["engine"] or "unknown": {key: row[key] for key in ("characters", "requests", "cache_hits", "latency")}
+                for row in rows}
+
+    def get_latency_history(self, limit=1000, max_characters=None):
+        """
+        Returns {engine: {"characters", "requests", "latency"}} over the `limit` most recent
+        synthesized chunks (cache hits excluded), optionally only those of up to
+        `max_characters`, e.g. to leave out asynchronous synthesis tasks.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT engine, SUM(characters) AS characters, COUNT(*) AS requests, SUM(latency) AS latency "
+                "FROM (SELECT engine, characters, latency FROM usage "
+                "      WHERE NOT cache_hit AND latency IS NOT NULL AND characters <= ? "
+                "      ORDER BY id DESC LIMIT ?) "
+                "GROUP BY engine",
+                (max_characters if max_characters is not None else 2 ** 62, limit)
+            ).fetchall()
+        return {row["engine"] or "unknown": {key: row[key] for key in ("characters", "requests", "latency")}
+                for row in rows}
 
     def get_summary(self):
+        engines = self.get_engine_totals()
+        total_characters = sum(totals["characters"] for totals in engines.values())
+        total_requests = sum(totals["requests"] for totals in engines.values())
+        cache_hits = sum(totals["cache_hits"] for totals in engines.values())
         return {
-            "total_characters": self.total_characters,
-            "total_requests": self.total_requests,
-            "average_characters_per_request": self.total_characters / self.total_requests if self.total_requests > 0 else 0
+            "total_characters": total_characters,
+            "total_requests": total_requests,
+            "average_characters_per_request": total_characters / total_requests if total_requests > 0 else 0,
+            "cache_hits": cache_hits,
+            "engines": engines,
         }
 
     def save_to_file(self, filename="polly_usage_log.json"):
+        # Exports a snapshot; the ledger itself is already on disk
         data = {
-            "log": list(self.log),
+            "log": self.get_log(),
             "summary": self.get_summary()
         }
         with open(filename, "w") as f:
             json.dump(data, f, indent=2)
 
     def load_from_file(self, filename="polly_usage_log.json"):
-        try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-                self.log = deque(data["log"], maxlen=self.log.maxlen)
-                self.total_characters = data["summary"]["total_characters"]
-                self.total_requests = data["summary"]["total_requests"]
-        except FileNotFoundError:
-            print(f"Log file {filename} not found. Starting with empty log.")
\ No newline at end of file
+        """
+        Imports the log of the former JSON tracker into an empty ledger, once. The old log was
+        capped, so its summary totals are imported as well, to keep the spend it no longer listed.
+        """
+        if not os.path.exists(filename):
+            return
+        with self.lock:
+            if self.db.execute("SELECT 1 FROM usage LIMIT 1").fetchone() is not None:
+                return
+        with open(filename, "r") as f:
+            data = json.load(f)
+        for entry in reversed(data.get("log", [])):
+            with self.lock:
+                self.db.execute(
+                    "INSERT INTO usage (timestamp, voice_id, engine, characters) VALUES (?, ?, ?, ?)",
+                    (entry["timestamp"], entry["voice_id"], entry.get("engine"), entry["characters"])
+                )
+
+        # The old tracker only had overall totals (engine unknown); exports of this one have them per engine
+        summary = data.get("summary", {})
+        engines = summary.get("engines") or {"": {"characters": summary.get("total_characters", 0),
+                                                   "requests": summary.get("total_requests", 0)}}
+        with self.lock:
+            for engine, totals in engines.items():
+                # Never below what the imported log entries already added
+                self.db.execute(
+                    "INSERT INTO usage_totals (engine, characters, requests, cache_hits, latency) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (engine) DO UPDATE SET "
+                    "    characters = MAX(characters, excluded.characters), "
+                    "    requests = MAX(requests, excluded.requests), "
+                    "    cache_hits = MAX(cache_hits, excluded.cache_hits), "
+                    "    latency = MAX(latency, excluded.latency)",
+                    ("" if engine == "unknown" else engine, totals.get("characters", 0), totals.get("requests", 0),
+                     totals.get("cache_hits", 0), totals.get("latency", 0.0))
+                )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
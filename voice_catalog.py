@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+
+class IncompleteCatalog(Exception):
+    """
+    Raised by a catalog fetch when some languages could not be listed; `voices` has the
+    voices of the other languages and `failed` maps each missing language to its error.
+    """
+    def __init__(self, voices, failed):
+        super().__init__("Could not list voices for " + ", ".join(f"{language} ({error})" for language, error in failed.items()))
+        self.voices = voices
+        self.failed = failed
+
+
+class VoiceCatalog:
+    """
+    Polly voices (language, gender and supported engines per voice id), persisted to `path` so
+    the app can start from the last known catalog and refresh it in the background once it is
+    older than `ttl` seconds. `fetch` returns a fresh catalog in the format of get_voice_capabilities,
+    or raises IncompleteCatalog when only some languages could be listed.
+    """
+    def __init__(self, path, ttl, fetch):
+        self.path = path
+        self.ttl = ttl
+        self.fetch = fetch
+        self.voices = {}
+        self.fetched_at = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.refresh_thread = None
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return self.voices
+            self.loaded = True
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.voices = data['voices']
+                self.fetched_at = data['fetched_at']
+            except (OSError, ValueError, KeyError):
+                pass  # missing or unreadable: the next refresh rewrites it
+            return self.voices
+
+    def is_stale(self):
+        self.load()
+        return self.fetched_at is None or time.time() - self.fetched_at > self.ttl
+
+    def engines(self, voice_id):
+        """
+        Returns the engines the voice supports, or None if it is not in the catalog.
+        """
+        voice = self.load().get(voice_id)
+        return voice['engine'] if voice is not None else None
+
+    def refresh(self):
+        self.load()
+        try:
+            voices = self.fetch()
+        except IncompleteCatalog as e:
+            with self.lock:
+                # Keep the last known voices of the languages that failed, and leave the catalog
+                # stale so the next start tries again
+                kept = {voice_id: voice for voice_id, voice in self.voices.items() if voice['language'] in e.failed}
+                self.voices = dict(e.voices, **kept)
+                self.error = str(e)
+                self._save()
+            return
+        except Exception as e:
+            self.error = str(e)
+            return
+        if not voices:
+            # Keep the last known catalog rather than replace it with nothing
+            self.error = "No voices returned by Polly"
+            return
+        with self.lock:
+            self.voices = voices
+            self.fetched_at = time.time()
+            self.loaded = True
+            self.error = None
+            self._save()
+
+    def refresh_in_background(self):
+        """
+        Starts refreshing the catalog on a daemon thread, unless a refresh is already running,
+        and returns the thread; `voices` and `error` are up to date once it has finished.
+        """
+        with self.lock:
+            if self.refresh_thread is None or not self.refresh_thread.is_alive():
+                self.refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+                self.refresh_thread.start()
+            return self.refresh_thread
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fetched_at": self.fetched_at, "voices": self.voices}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)